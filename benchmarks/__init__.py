@@ -0,0 +1,2 @@
+"""Benchmarks for the photobook package. Run the individual modules from the repository root, i.e.
+`python -m benchmarks.photo_memory`."""
@@ -0,0 +1,115 @@
+"""Benchmark of the sub-finder dispatch in ContentFinder.search_stream.
+
+Parses a generated journal with a deeply nested grammar (five heading levels, each with list, quote, date and text
+sub-finders) with the combined single-pass start pattern dispatch, with the sub-finders matched one by one, and
+with the previous implementation, which matched each sub-finder in turn, backtracked the stream, and let the
+matching sub-finder match the line again before running finditer for its groups.
+
+Usage:
+    python -m benchmarks.content_finder_dispatch [number_of_sections]
+"""
+import re
+import sys
+import time
+
+from photobook import model, readers
+
+DEPTH = 5
+REPEAT = 5
+
+
+class LegacyContentFinder(model.ContentFinder):
+    """The previous implementation of ContentFinder.search_stream."""
+
+    def search_stream(self, stream, rematch_on_start=False, stop_at_new_start=True, start_properties=None):
+        content = None
+        while True:
+            line = stream.get_line()
+            if line is None:
+                break
+            if not content:
+                if self.start_pattern.match(line):
+                    properties = next(self.start_pattern.finditer(line)).groupdict()
+                    content = self.content_type(**properties)
+                    if not self.sub_content_finders:
+                        break
+                    if rematch_on_start:
+                        stream.backtrack_reader_number_of_lines(1)
+            else:
+                if self.end_pattern and self.end_pattern.match(line):
+                    break
+                elif self.sub_content_finders:
+                    for sub in self.sub_content_finders:
+                        if sub.start_pattern.match(line):
+                            stream.backtrack_reader_number_of_lines(1)
+                            content.add_content(sub.search_stream(stream))
+                elif stop_at_new_start and self.start_pattern.match(line):
+                    stream.backtrack_reader_number_of_lines(1)
+                    break
+        return content
+
+
+class LegacyFileFinder(LegacyContentFinder, model.FileFinder):
+    pass
+
+
+class Heading(model.Content):
+    pass
+
+
+class Leaf(model.Content):
+    pass
+
+
+def grammar(finder=model.ContentFinder, file_finder=model.FileFinder) -> model.FileFinder:
+    leaves = [finder(start_pattern=re.compile(r'^[-*] (?P<item>.+)$'), content_type=Leaf),
+              finder(start_pattern=re.compile(r'^> (?P<quote>.+)$'), content_type=Leaf),
+              finder(start_pattern=re.compile(r'^@ (?P<day>\d{2})\.(?P<month>\d{2})\.(?P<year>\d{4})$'),
+                     content_type=Leaf),
+              finder(start_pattern=re.compile(r'^(?P<text>[^#>@*-].*)$'), content_type=Leaf)]
+    finders = leaves
+    for level in range(DEPTH, 0, -1):
+        heading = finder(start_pattern=re.compile(f'^{"#" * level} (?P<title>[^#].*)$'),
+                         content_type=Heading,
+                         sub_content_finders=finders)
+        finders = [heading] + leaves
+    return file_finder(sub_content_finders=finders)
+
+
+def journal(sections: int) -> str:
+    lines = []
+    for i in range(sections):
+        for level in range(1, DEPTH + 1):
+            lines.append(f'{"#" * level} Section {i} level {level}')
+            lines.extend([f'- item {i}', f'> quote {i}', '@ 17.05.2018', f'Some text in section {i}.'])
+    return '\n'.join(lines)
+
+
+def run(text: str, combine: bool, legacy: bool = False, repeat: int = REPEAT) -> float:
+    """Return the fastest of repeat parses of text."""
+    model.ContentFinder.combine_start_patterns = combine
+    finder = grammar(LegacyContentFinder, LegacyFileFinder) if legacy else grammar()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        finder.parse_file(readers.TextStream(readers.StringReader(text)))
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(sections: int = 2000) -> None:
+    text = journal(sections)
+    legacy = run(text, combine=False, legacy=True)
+    sequential = run(text, combine=False)
+    combined = run(text, combine=True)
+    model.ContentFinder.combine_start_patterns = True
+
+    lines = text.count('\n') + 1
+    print(f'{lines} lines, {DEPTH} nesting levels:')
+    print(f'  previous implementation: {legacy:.3f} s')
+    print(f'  sequential dispatch:     {sequential:.3f} s ({legacy / sequential:.1f}x)')
+    print(f'  combined dispatch:       {combined:.3f} s ({legacy / combined:.1f}x)')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""Benchmark of the strict numeric fast path in DateParse.
+
+Parses the header and period dates of a generated journal, like Text does for every entry, once with and once
+without the fast path. The parse cache is disabled so that every string is actually parsed.
+
+Usage:
+    python -m benchmarks.dateparse_fast_path [number_of_entries]
+"""
+import sys
+import time
+import random
+import datetime
+
+from photobook.dateparse import DateParse
+
+
+def journal_dates(n: int, seed: int = 0) -> list:
+    """Return the date strings of a journal with n entries, as found in the headers and '*' lines of context.md."""
+    rng = random.Random(seed)
+    start = datetime.datetime(2015, 1, 1)
+    strings = []
+    for _ in range(n):
+        written = start + datetime.timedelta(minutes=rng.randrange(4 * 365 * 24 * 60))
+        first = written - datetime.timedelta(days=rng.randrange(1, 60))
+        last = first + datetime.timedelta(days=rng.randrange(0, 14))
+        strings.append(written.strftime('%d.%m.%Y %H:%M'))
+        if rng.random() < 0.5:
+            strings.extend([first.strftime('%d.%m.%Y'), last.strftime('%d.%m.%Y')])
+        else:
+            strings.append(first.strftime('%Y.%m.%d'))
+    return strings
+
+
+def run(parser: DateParse, strings: list) -> float:
+    start = time.perf_counter()
+    for string in strings:
+        parser.parse(string, full_text=True)
+    return time.perf_counter() - start
+
+
+def main(n: int = 500) -> None:
+    strings = journal_dates(n)
+    slow = run(DateParse(cache_size=0, fast_path=False), strings)
+    fast = run(DateParse(cache_size=0, fast_path=True), strings)
+
+    print(f'{len(strings)} date strings from {n} journal entries:')
+    print(f'  full search: {slow:.3f} s ({1e6 * slow / len(strings):.0f} us per string)')
+    print(f'  fast path:   {fast:.3f} s ({1e6 * fast / len(strings):.1f} us per string)')
+    print(f'  speedup:     {slow / fast:.0f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,51 @@
+"""Memory benchmark showing the per-photo footprint of Photo objects.
+
+Builds a large number of Photo objects from the tags of the test fixtures and measures the allocated memory with
+tracemalloc. For comparison, it also measures the size of the full exifread tag dict that each Photo used to carry.
+
+Usage:
+    python -m benchmarks.photo_memory [number_of_photos]
+"""
+import os
+import sys
+import glob
+import tracemalloc
+
+from photobook.main import Photo
+
+BIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test', 'bin')
+
+
+def measure(function, *args) -> int:
+    """Return the number of bytes still allocated after calling function(*args), while keeping the result alive."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = function(*args)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del result
+    return size
+
+
+def build_photos(tags: list, n: int) -> list:
+    return [Photo(f'/photos/{i:06d}.jpg', tags=tags[i % len(tags)]) for i in range(n)]
+
+
+def read_exif(photo: Photo) -> dict:
+    return photo.exif
+
+
+def main(n: int = 10000) -> None:
+    files = sorted(glob.glob(os.path.join(BIN, '*.jpg')))
+    tags = [Photo.read_tags(file) for file in files]
+
+    photos_size = measure(build_photos, tags, n)
+    exif_size = measure(read_exif, Photo(files[0]))
+
+    print(f'{n} photos: {photos_size / 1024:.0f} KiB, {photos_size / n:.0f} bytes per photo.')
+    print(f'Full EXIF dict of a single photo (not kept by Photo): {exif_size / 1024:.0f} KiB.')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
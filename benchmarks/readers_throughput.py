@@ -0,0 +1,70 @@
+"""Throughput benchmark for the text readers.
+
+Reads a generated journal through StringReader and FileReader, both directly and through a TextStream, and reports
+lines and megabytes per second.
+
+Usage:
+    python -m benchmarks.readers_throughput [number_of_lines]
+"""
+import os
+import sys
+import time
+import tempfile
+
+from photobook import readers
+
+LINE = 'It was a really, really cold winter. Everything was covered in deep, white snow for months.'
+
+
+def journal(n: int) -> str:
+    lines = []
+    for i in range(n):
+        if i % 10 == 0:
+            lines.append(f'# {1 + i % 28:02d}.06.2018 21:00 Tobias')
+        elif i % 10 == 1:
+            lines.append(f'* {1 + i % 28:02d}.01.2018')
+        else:
+            lines.append(LINE)
+    return '\n'.join(lines)
+
+
+def read_all(reader: readers.Reader, stream: bool) -> int:
+    count = 0
+    if stream:
+        text_stream = readers.TextStream(reader=reader)
+        while text_stream.get_line() is not None:
+            count += 1
+    else:
+        while reader.read_line() is not None:
+            count += 1
+    return count
+
+
+def report(name: str, seconds: float, lines: int, size: int) -> None:
+    print(f'  {name:<28}{seconds:8.3f} s {lines / seconds / 1e6:8.2f} Mlines/s {size / seconds / 2**20:8.1f} MB/s')
+
+
+def main(n: int = 500000) -> None:
+    text = journal(n)
+    size = len(text.encode('utf-8'))
+    print(f'{n} lines, {size / 2**20:.1f} MB:')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'journal.md')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        for stream in (False, True):
+            suffix = ' + TextStream' if stream else ''
+            start = time.perf_counter()
+            lines = read_all(readers.StringReader(text), stream)
+            report('StringReader' + suffix, time.perf_counter() - start, lines, size)
+
+            start = time.perf_counter()
+            with readers.FileReader(path, encoding='utf-8') as reader:
+                lines = read_all(reader, stream)
+            report('FileReader' + suffix, time.perf_counter() - start, lines, size)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
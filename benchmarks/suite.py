@@ -0,0 +1,119 @@
+"""End-to-end benchmark of the stages of building a photobook.
+
+Generates a synthetic photo store and journal (see benchmarks.synthetic), and times each stage of building a book
+from them. Every stage is run a number of times and the fastest run is reported. The results are written as JSON,
+together with the current git commit, so that runs on different commits can be compared.
+
+Usage:
+    python -m benchmarks.suite [number_of_photos] [number_of_entries] [output.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import subprocess
+import tempfile
+import datetime
+import typing as ty
+
+from photobook.main import Photobook, PhotoCollection, TextCollection
+from photobook.latex import LatexWriter
+from photobook.templates import L3P, Page
+from photobook import pdf, dateparse
+from benchmarks.synthetic import write_photos, write_journal
+
+REPEAT = 3
+
+
+def best_of(function: ty.Callable, repeat: int = REPEAT) -> ty.Tuple[float, ty.Any]:
+    """Return the fastest time of repeat calls to function, and the result of the last call."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def commit() -> ty.Optional[str]:
+    """The git commit of the working directory, if any."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.decode().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def layout_pages(photos: PhotoCollection, page: Page) -> ty.List[str]:
+    """Lay out the portrait photos three by three with the L3P template."""
+    portraits = [photo for photo in photos if photo.shape == 'portrait']
+    return [L3P(page=page, photos=portraits[i:i + 3]).latex() for i in range(0, len(portraits) - 2, 3)]
+
+
+def run(directory: str, n: int, m: int) -> ty.Dict[str, ty.Any]:
+    start = time.perf_counter()
+    write_photos(directory, n)
+    write_journal(os.path.join(directory, 'journal.md'), m)
+    generate = time.perf_counter() - start
+
+    photo_store, text_store = os.path.join(directory, '*.jpg'), os.path.join(directory, 'journal.md')
+    stages = {}
+    stages['PhotoCollection.load'], photos = best_of(lambda: PhotoCollection(photo_store))
+
+    def texts():
+        dateparse.cache_clear()  # Parse the dates of every run, instead of timing the cache.
+        return TextCollection(text_store)
+
+    stages['TextCollection'], _ = best_of(texts)
+
+    book = Photobook(photo_store=photo_store, text_store=text_store)
+
+    def chapters():
+        book.chapters = []
+        book.chapters_from_text_and_images()
+        return book.chapters
+
+    stages['chapters_from_text_and_images'], _ = best_of(chapters)
+
+    def write_latex():
+        with LatexWriter.open(os.path.join(directory, 'book.tex')) as writer:
+            for chapter in book.chapters:
+                writer.chapter(chapter)
+
+    stages['latex'], _ = best_of(write_latex)
+    page = Page(height=21, width=29.7, unit='cm', margins=1)
+    stages['templates.L3P'], pages = best_of(lambda: layout_pages(photos, page))
+    stages['pdf.write_book'], _ = best_of(lambda: pdf.write_book(book, os.path.join(directory, 'book.pdf')))
+
+    return {'commit': commit(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'photos': n,
+            'entries': m,
+            'chapters': len(book.chapters),
+            'template_pages': len(pages),
+            'generate_inputs': generate,
+            'stages': stages}
+
+
+def main(n: int = 1000, m: int = 200, output: str = 'benchmark.json') -> None:
+    # A directory name without underscores, as the photo paths are used in LaTeX:
+    directory = os.path.join(tempfile.gettempdir(), f'photobook-benchmark-{os.getpid()}')
+    try:
+        results = run(directory, n, m)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'{n} photos, {m} journal entries, {results["chapters"]} chapters:')
+    for stage, seconds in results['stages'].items():
+        print(f'    {stage}: {seconds * 1000:.1f} ms')
+    print(f'Results written to {output}.')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]], *sys.argv[3:4])
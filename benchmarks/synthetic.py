@@ -0,0 +1,90 @@
+"""Generators of synthetic photo stores and journals for benchmarking.
+
+write_photos creates small JPEGs with EXIF timestamps and orientations like those of a phone camera. The timestamps
+come in bursts of photos taken at the same event, spread over several years. write_journal creates a text file in the
+format of test/bin/context.md, with entries covering periods within the same years.
+
+Usage:
+    python -m benchmarks.synthetic directory [number_of_photos] [number_of_entries]
+"""
+import os
+import sys
+import random
+import datetime
+import typing as ty
+
+from PIL import Image
+
+from photobook import exifheader
+
+START = datetime.datetime(2015, 1, 1)
+YEARS = 4
+EXIF_TIMESTAMP_FORMAT = '%Y:%m:%d %H:%M:%S'
+
+# EXIF orientation values and how common they are among phone photos:
+ORIENTATION_WEIGHTS = {1: 55, 6: 30, 8: 5, 3: 8, 2: 0.5, 4: 0.5, 5: 0.5, 7: 0.5}
+
+AUTHORS = ['Tobias', 'Guro']
+WORDS = ('we went to the cabin and it was snowing all day so the kids built a snowman while grandma made waffles '
+         'later the sun came out and everything was bright and crisp and clean').split()
+
+
+def photo_timestamps(n: int, rng: random.Random) -> ty.List[datetime.datetime]:
+    """Return n sorted timestamps, in bursts of a few photos within minutes of each other."""
+    timestamps = []
+    while len(timestamps) < n:
+        event = START + datetime.timedelta(seconds=rng.randrange(YEARS * 365 * 24 * 60 * 60))
+        for _ in range(min(rng.randint(1, 20), n - len(timestamps))):
+            event += datetime.timedelta(seconds=rng.randint(1, 600))
+            timestamps.append(event)
+    return sorted(timestamps)
+
+
+def write_photos(directory: str, n: int, seed: int = 0, size: ty.Tuple[int, int] = (64, 48)) -> ty.List[str]:
+    """Write n JPEGs with EXIF timestamps and orientations to directory. Returns the file paths.
+
+    The photos are stored in landscape size, and a rotated orientation makes them portraits, like photos from a
+    phone held upright."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    orientations = rng.choices(list(ORIENTATION_WEIGHTS), weights=list(ORIENTATION_WEIGHTS.values()), k=n)
+    files = []
+    for i, (timestamp, orientation) in enumerate(zip(photo_timestamps(n, rng), orientations)):
+        image = Image.new('RGB', size, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        exif = Image.Exif()
+        exif[exifheader.ORIENTATION] = orientation
+        exif_ifd = exif.get_ifd(exifheader.EXIF_OFFSET)
+        exif_ifd[exifheader.DATE_TIME_ORIGINAL] = timestamp.strftime(EXIF_TIMESTAMP_FORMAT)
+        exif_ifd[exifheader.EXIF_IMAGE_WIDTH], exif_ifd[exifheader.EXIF_IMAGE_LENGTH] = size
+        file = os.path.join(directory, f'IMG{i:06d}.jpg')
+        image.save(file, exif=exif)
+        files.append(file)
+    return files
+
+
+def write_journal(filepath: str, m: int, seed: int = 0) -> None:
+    """Write a journal with m entries in the format of context.md to filepath."""
+    rng = random.Random(seed)
+    with open(filepath, 'w', encoding='utf-8') as f:
+        for _ in range(m):
+            first = START + datetime.timedelta(days=rng.randrange(YEARS * 365))
+            last = first + datetime.timedelta(days=rng.randrange(0, 14))
+            written = last + datetime.timedelta(days=rng.randrange(1, 60), minutes=rng.randrange(24 * 60))
+            f.write(f'# {written:%d.%m.%Y %H:%M} {rng.choice(AUTHORS)}\n')
+            if first == last:
+                f.write(f'* {first:%Y.%m.%d}\n\n')
+            else:
+                f.write(f'* {first:%d.%m.%Y}-{last:%d.%m.%Y}\n\n')
+            sentences = [' '.join(rng.choices(WORDS, k=rng.randint(5, 20))).capitalize() + '.'
+                         for _ in range(rng.randint(1, 8))]
+            f.write(' '.join(sentences) + '\n\n')
+
+
+def main(directory: str, n: int = 1000, m: int = 200) -> None:
+    write_photos(directory, n)
+    write_journal(os.path.join(directory, 'journal.md'), m)
+    print(f'Wrote {n} photos and a journal of {m} entries to {directory}.')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], *[int(arg) for arg in sys.argv[2:]])
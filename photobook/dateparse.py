@@ -32,13 +32,44 @@ Future improvements:
 '''
 
 import re
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import datetime
 
 
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+DEFAULT_CACHE_SIZE = 4096
+
+# Strict, machine-like numeric layouts that are recognized by a single regex match, without going through the complex
+# search. The layouts must cover the entire string.
+STRICT_TIME = r'(?:[ T](?P<hour>\d{1,2}):(?P<minute>\d{2})(?::(?P<second>\d{2}))?)?'
+STRICT_LAYOUTS = OrderedDict([
+    ('day-month-year', re.compile(
+        r'(?P<day>\d{1,2})(?P<separator>[./-])(?P<month>\d{1,2})(?P=separator)(?P<year>\d{4})' + STRICT_TIME)),
+    ('year-month-day', re.compile(
+        r'(?P<year>\d{4})(?P<separator>[./:-])(?P<month>\d{1,2})(?P=separator)(?P<day>\d{1,2})' + STRICT_TIME)),
+])
+
+# The STRICT_LAYOUTS for finding every match in a newline separated group of strings:
+STRICT_BATCH_LAYOUTS = OrderedDict(
+    (name, re.compile('^' + layout.pattern + '$', re.MULTILINE)) for name, layout in STRICT_LAYOUTS.items())
+DIGIT_SHAPES = str.maketrans('0123456789', '0000000000')
+
+
+def strict_datetime(found):
+    '''Create a datetime from a match of one of the STRICT_LAYOUTS, or None if the numbers are not a valid date.'''
+    parts = found.groupdict()
+    try:
+        return datetime.datetime(int(parts['year']), int(parts['month']), int(parts['day']),
+                                 int(parts['hour'] or 0), int(parts['minute'] or 0), int(parts['second'] or 0))
+    except ValueError:
+        return None
+
+
 class DateParse(object):
 
-    def __init__(self):
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, fast_path=True):
         self.days = {  # NOT USED FOR ANYTHING
             'første': 1,
             'andre': 2,
@@ -247,7 +278,52 @@ class DateParse(object):
         self.referenceDate = None
         self.string = ''
 
+        # Try STRICT_LAYOUTS before the complex search:
+        self.fast_path = fast_path
+
+        # LRU cache of parse results:
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     def parse(self, stringIn, debugMode=False, referenceDate=None, full_text=False):
+        '''
+        Cached version of parse_uncached. The cache key contains the string, full_text, referenceDate and the date of
+        today, so relative results like weekdays and dates without year are recalculated when the day changes.
+        debugMode bypasses the cache.
+        '''
+        if debugMode or not self.cache_size:
+            return self.parse_uncached(stringIn, debugMode=debugMode, referenceDate=referenceDate,
+                                       full_text=full_text)
+
+        key = (stringIn, full_text, referenceDate, datetime.date.today())
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            result = self.cache[key]
+        else:
+            self.cache_misses += 1
+            result = self.parse_uncached(stringIn, referenceDate=referenceDate, full_text=full_text)
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        if not result:
+            return []  # Never hand out the cached (mutable) empty list.
+        return result
+
+    def cache_info(self):
+        '''Return hit/miss statistics of the parse cache.'''
+        return CacheInfo(self.cache_hits, self.cache_misses, self.cache_size, len(self.cache))
+
+    def cache_clear(self):
+        '''Empty the parse cache and reset the statistics.'''
+        self.cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def parse_uncached(self, stringIn, debugMode=False, referenceDate=None, full_text=False):
         '''
         (stringIn = string, debugMode = boolean/False)
         Takes any string and checks if it can find any valid dates within. Variable
@@ -277,21 +353,11 @@ class DateParse(object):
 
         date = []
 
-        # # Check for simple, pure number dates:
-        # dayFormat = r'(?P<day>\d{2})'
-        # monthFormat = r'(?P<month>\d{2})'
-        # yearFormat = r'(?P<year>\d{4}|\d{2})'
-        # simpleCombos = [[dayFormat, monthFormat, yearFormat], [yearFormat, monthFormat, dayFormat]]
-        # for combo in simpleCombos:
-        #     pattern = '\D{1,2}?'.join(combo)
-        #     if full_text:
-        #         '^' + pattern + '$'
-        #     r = re.compile(pattern)
-        #     date = [found for found in r.finditer(string)]
-        #
-        #     [match, date] = self.checkDate(date)
-        #     if match:
-        #         break
+        # Check for strict, pure number dates before the complex search:
+        if self.fast_path and not debugMode:
+            strict = self.parse_strict(string)
+            if strict:
+                return strict
 
         # Complex date search:
         if not match:
@@ -306,7 +372,7 @@ class DateParse(object):
                 if [True for c in combo if 'relativeYear' in c]:
                     loopThrough = self.relativeYears
                     for Str, Num in loopThrough.items():
-                        patternPart['relativeYear'] = r'(?P<month>(?i)%s)' % Str
+                        patternPart['relativeYear'] = r'(?P<month>(?i:%s))' % Str
                         patternPart['year'] = r'(?P<year>\d{4}|\d{2})'
                         [match, date] = self.checkPattern(patternPart, combo, Num, full_text=full_text)
                         if match: break
@@ -314,15 +380,15 @@ class DateParse(object):
                 elif [True for c in combo if 'relativeCentury' in c or 'century' in c]:
                     loopThrough = self.relativeCenturies
                     for Str, Num in loopThrough.items():
-                        patternPart['century'] = r'(?P<century>(?i)%s)' % '|(?i)'.join(self.centuries)
-                        patternPart['relativeCentury'] = r'(?P<relativeCentury>(?i)%s)' % '|(?i)'.join([Str])
+                        patternPart['century'] = r'(?P<century>(?i:%s))' % '|'.join(self.centuries)
+                        patternPart['relativeCentury'] = r'(?P<relativeCentury>(?i:%s))' % '|'.join([Str])
                         [match, date] = self.checkPattern(patternPart, combo, Num, centuryCheck=True, full_text=full_text)
                         if match: break
 
                 elif [True for c in combo if 'weekday' in c]:
                     loopThrough = self.weekdays
                     for Str, Num in loopThrough.items():
-                        patternPart['weekday'] = r'(?P<weekday>(?i)%s)' % Str
+                        patternPart['weekday'] = r'(?P<weekday>(?i:%s))' % Str
                         [match, date] = self.checkPattern(patternPart, combo, Num, full_text=full_text)
                         if match: break
 
@@ -330,7 +396,7 @@ class DateParse(object):
                     loopThrough = self.months
                     for Str, Num in loopThrough.items():
                         patternPart['day'] = r'(?P<day>\d{1,2})'
-                        patternPart['month'] = r'(?P<month>(?i)%s)' % '|(?i)'.join(
+                        patternPart['month'] = r'(?P<month>(?i:%s))' % '|'.join(
                             [Str] + [r'(?:^|(?<=[^:\d]))0?' + str(Num) + r'(?:(?=[^:\d])|$)'])
                         patternPart['year'] = r'(?P<year>\d{4}|\d{2})'
                         [match, date] = self.checkPattern(patternPart, combo, Num, full_text=full_text)
@@ -346,6 +412,19 @@ class DateParse(object):
             else:
                 return []
 
+    def parse_strict(self, string):
+        '''
+        Return the datetime of a string that is entirely one of the machine-like numeric layouts in STRICT_LAYOUTS,
+        like '16.06.2018 21:00', '2018.05.17' or '2018:01:19 08:39:51'. Returns None if no layout matches or the
+        numbers are not a valid date.
+        '''
+        string = string.strip()
+        for layout in STRICT_LAYOUTS.values():
+            found = layout.fullmatch(string)
+            if found:
+                return strict_datetime(found)
+        return None
+
     def checkPattern(self, patternPart, combo, Num=0, centuryCheck=False, full_text=False):
         # Run a pattern through the regular expression and return output.
         pattern = '(?:^|(?<=\D))' + '(?=[^:\d])[^:\d]{1,4}?(?<=[^:\d])'.join(combo) % patternPart + '(?:(?=\D)|$)'
@@ -493,5 +572,61 @@ class DateParse(object):
 parser = DateParse()
 
 
-def parse(string, full_text=False):
-    return parser.parse(string, full_text=full_text)
+def parse(string, full_text=False, reference_date=None):
+    return parser.parse(string, full_text=full_text, referenceDate=reference_date)
+
+
+def _parse_chunk(arguments):
+    '''Parse a chunk of strings in a worker process.'''
+    strings, full_text, reference_date = arguments
+    return [parse(string, full_text=full_text, reference_date=reference_date) for string in strings]
+
+
+def parse_many(strings, full_text=False, reference_date=None, jobs=None, min_strings_per_job=256):
+    '''
+    Parse a batch of strings, returning a list with the result of parse() for each string.
+    Duplicate strings are only parsed once. Strings are grouped by shape, and each group that fits one of the
+    STRICT_LAYOUTS is parsed by running the compiled layout once over the whole group. The remaining strings go
+    through the (cached) complex search, which is spread over a pool of jobs worker processes if jobs > 1 and there
+    are at least min_strings_per_job strings per job.
+    '''
+    unique = list(OrderedDict.fromkeys(strings))
+    results = {}
+
+    if parser.fast_path:
+        # Group the strings by shape, where every digit is replaced by 0:
+        groups = OrderedDict()
+        for string in unique:
+            stripped = string.strip()
+            if '\n' not in stripped:
+                groups.setdefault(stripped.translate(DIGIT_SHAPES), []).append(string)
+
+        for shape, group in groups.items():
+            layout = next((layout for layout in STRICT_BATCH_LAYOUTS.values() if layout.match(shape)), None)
+            if not layout:
+                continue
+            stripped = [string.strip() for string in group]
+            found = {match.group(0): strict_datetime(match) for match in layout.finditer('\n'.join(stripped))}
+            for string, key in zip(group, stripped):
+                if found.get(key):
+                    results[string] = found[key]
+
+    remaining = [string for string in unique if string not in results]
+    if jobs and jobs > 1 and len(remaining) >= jobs * min_strings_per_job:
+        size = -(-len(remaining) // jobs)
+        chunks = [(remaining[i:i + size], full_text, reference_date) for i in range(0, len(remaining), size)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parsed = [result for chunk in pool.map(_parse_chunk, chunks) for result in chunk]
+    else:
+        parsed = _parse_chunk((remaining, full_text, reference_date))
+    results.update(zip(remaining, parsed))
+
+    return [results[string] if results[string] else [] for string in strings]
+
+
+def cache_info():
+    return parser.cache_info()
+
+
+def cache_clear():
+    parser.cache_clear()
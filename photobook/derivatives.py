@@ -0,0 +1,217 @@
+"""Print resolution derivatives of photos.
+
+Camera JPEGs are far larger than what is needed for print. A photo placed at a third of an A4 page is around 800
+pixels wide at 300 dpi, while the original is often 4000-8000 pixels wide. The DerivativeStore resamples each photo to
+exactly the size it is placed at, and the LaTeX of the photo then references the derivative instead of the original.
+
+Derivatives are named by the content hash of the source file and their size, and are reused across runs for as long
+as the source file is unchanged. The content hash of each source file is kept in an index in the derivative directory,
+keyed by the path, size and modification time of the file, so a source file is only read in full when it has changed.
+The JPEG density of a derivative is set to the dpi of the store, so that it has the
+placed size when included without an explicit width.
+
+With upright=True, the EXIF orientation of each photo is applied to the pixels of the derivative, including the
+mirrored orientations, so that the LaTeX needs no rotation and the size of the derivative is its displayed size.
+Photos in other orientations than normal then get an upright derivative even if they are not resampled.
+"""
+import os
+import hashlib
+import typing as ty
+from collections import namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from PIL import Image
+
+from photobook.main import Photo
+from photobook.exifcache import FileCache
+from photobook.templates import Page
+
+DEFAULT_DPI = 300
+DEFAULT_QUALITY = 90
+DEFAULT_DIRECTORY_NAME = '.photobook-derivatives'  # No underscores, as the path is used in LaTeX.
+INDEX_NAME = 'index.sqlite'
+
+Derivative = namedtuple('Derivative', ['filepath', 'width', 'height', 'upright'])
+Placement = ty.Tuple[Photo, ty.Optional[float], ty.Optional[float]]
+
+
+def file_digest(filepath: str, block_size: int = 1 << 20) -> str:
+    """Return the sha1 hex digest of the contents of a file."""
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def create_derivative(filepath: str, size: ty.Tuple[int, int], directory: str, dpi: int = DEFAULT_DPI,
+                      quality: int = DEFAULT_QUALITY, transpose: int = None, digest: str = None) -> Derivative:
+    """Resample the photo at filepath to size, and save it in directory. An existing derivative of the same source
+    contents, size and dpi is reused.
+
+    If transpose is given, the derivative is made upright by this PIL transpose method after resampling, and size is
+    the size after the transpose. digest is the file_digest of filepath, which is computed if not given."""
+    width, height = size
+    upright = transpose is not None
+    if digest is None:
+        digest = file_digest(filepath)
+    name = f'{digest}-{width}x{height}-{dpi}dpi{"-upright" if upright else ""}.jpg'
+    target = os.path.join(directory, name)
+    if not os.path.exists(target):
+        if transpose in Photo.axis_swapping_transposes:
+            size = height, width  # The size before turning the photo upright.
+        with Image.open(filepath) as image:
+            image.draft('RGB', size)  # Let the JPEG decoder scale down by a power of two before resampling.
+            derivative = image.convert('RGB')
+            if derivative.size != size:
+                derivative = derivative.resize(size, Image.LANCZOS)
+        if upright:
+            derivative = derivative.transpose(transpose)
+        # Write to a temporary file first, so that an interrupted run never leaves a broken derivative behind:
+        temporary = f'{target}.{os.getpid()}.tmp'
+        derivative.save(temporary, format='JPEG', quality=quality, dpi=(dpi, dpi))
+        os.replace(temporary, target)
+    return Derivative(target, width, height, upright)
+
+
+def _create_derivative(args: tuple) -> Derivative:
+    return create_derivative(*args)
+
+
+class DigestIndex(FileCache):
+    """SQLite backed index of the file_digest of source files, keyed by their path, size and modification time."""
+    table = 'digests'
+
+
+class DerivativeStore:
+    """A directory of print resolution derivatives."""
+
+    def __init__(self, directory: str, dpi: int = DEFAULT_DPI, quality: int = DEFAULT_QUALITY, upright: bool = False,
+                 jobs: int = None, executor: Executor = None) -> None:
+        """Open (or create) a directory of derivatives.
+
+        Args:
+            directory: The directory the derivatives are stored in. Created if it does not exist.
+            dpi: The print resolution of the derivatives.
+            quality: The JPEG quality of the derivatives.
+            upright: Apply the EXIF orientation of the photos to the pixels of the derivatives.
+            jobs: Number of worker processes used for resampling. None or 1 resamples in the current process.
+            executor: An existing concurrent.futures executor used for resampling. Overrides jobs.
+        """
+        self.directory = directory
+        self.dpi = dpi
+        self.quality = quality
+        self.upright = upright
+        self.jobs = jobs
+        self.executor = executor
+        os.makedirs(directory, exist_ok=True)
+        self.index = DigestIndex(os.path.join(directory, INDEX_NAME))
+
+    @classmethod
+    def for_store(cls, search: str, **kwargs) -> 'DerivativeStore':
+        """Open the default derivative directory located next to the photos matched by a search pattern."""
+        return cls(os.path.join(os.path.dirname(os.path.abspath(search)), DEFAULT_DIRECTORY_NAME), **kwargs)
+
+    def size(self, photo: Photo, page: Page, width: float = None,
+             height: float = None) -> ty.Optional[ty.Tuple[int, int]]:
+        """Return the pixel size of the derivative of photo, when displayed within width and height page units.
+
+        The size is in the orientation of the stored pixels, or the displayed orientation for an upright store.
+        Returns None if no derivative is needed, i.e. if the photo is not larger than the placed size, and does not
+        need to be turned upright."""
+        assert width or height
+        display_width, display_height = photo.display_size
+        scales = []
+        if width:
+            scales.append(page.pixels(width, self.dpi) / display_width)
+        if height:
+            scales.append(page.pixels(height, self.dpi) / display_height)
+        scale = min(scales)
+        transpose = photo.transpose if self.upright else None
+        if scale >= 1:
+            if transpose is None:
+                return None
+            scale = 1
+        pixel_width, pixel_height = (photo.width, photo.height) if transpose is None else photo.display_size
+        return max(1, round(pixel_width * scale)), max(1, round(pixel_height * scale))
+
+    def create(self, page: Page, placements: ty.Iterable[Placement]) -> ty.List[Derivative]:
+        """Create the derivatives of the placed photos, and set them as Photo.derivative.
+
+        Args:
+            page: The page the photos are placed on.
+            placements: (photo, width, height) of each placed photo in page units, i.e. from L3P.placements.
+                A photo placed more than once gets a single derivative for the largest placement.
+
+        Returns:
+            The derivatives in the order of the photos first placement, excluding photos that are not resampled.
+        """
+        largest = {}
+        for photo, width, height in placements:
+            size = self.size(photo, page, width, height)
+            if photo.filepath in largest:
+                previous = largest[photo.filepath][1]
+                if previous is None or (size is not None and size[0] <= previous[0]):
+                    continue
+            largest[photo.filepath] = (photo, size)
+
+        photos = [(photo, size) for photo, size in largest.values() if size]
+        executor = self.executor
+        if executor is None and self.jobs and self.jobs > 1 and len(photos) > 1:
+            executor = ProcessPoolExecutor(max_workers=self.jobs)
+        map_ = executor.map if executor is not None else map
+        try:
+            digests = self.digests([photo.filepath for photo, _ in photos], map_)
+            jobs = [(photo.filepath, size, self.directory, self.dpi, self.quality,
+                     photo.transpose if self.upright else None, digest)
+                    for (photo, size), digest in zip(photos, digests)]
+            derivatives = list(map_(_create_derivative, jobs))
+        finally:
+            if executor is not self.executor:
+                executor.shutdown()
+
+        for photo, size in largest.values():
+            if not size:
+                photo.derivative = None  # The original is used.
+        for (photo, _), derivative in zip(photos, derivatives):
+            photo.derivative = derivative
+        return derivatives
+
+    def digests(self, files: ty.List[str], map_: ty.Callable = map) -> ty.List[str]:
+        """Return the file_digest of each file. Only files that are not in the index, or have changed since they were
+        indexed, are read. These are hashed with map_, i.e. the map of an executor."""
+        digests = [self.index.get(file) for file in files]
+        missing = [i for i, digest in enumerate(digests) if digest is None]
+        for i, digest in zip(missing, map_(file_digest, [files[i] for i in missing])):
+            digests[i] = digest
+            self.index.put(files[i], digest)
+        self.index.commit()
+        return digests
+
+    def prune(self, keep: ty.Iterable[Derivative]) -> int:
+        """Remove all derivatives that are not in keep. Returns the number of removed files. The index is kept."""
+        keep = {os.path.abspath(derivative.filepath) for derivative in keep}
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.startswith(INDEX_NAME):  # The index, and its SQLite journal.
+                continue
+            filepath = os.path.abspath(os.path.join(self.directory, name))
+            if filepath not in keep:
+                os.remove(filepath)
+                removed += 1
+        return removed
+
+    def close(self) -> None:
+        self.index.close()
+
+    def __enter__(self) -> 'DerivativeStore':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __str__(self) -> str:
+        return f'<DerivativeStore: {self.directory} at {self.dpi} dpi.>'
+
+    def __repr__(self) -> str:
+        return str(self)
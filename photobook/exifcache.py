@@ -0,0 +1,118 @@
+"""Persistent on-disk cache for the EXIF tags extracted from photos.
+
+Parsing EXIF data is by far the most expensive part of loading a photo store. The ExifCache keeps the values of
+Photo.get_tags in a SQLite file, keyed by the absolute path of each photo together with its size and modification
+time, so that unchanged files can skip EXIF parsing entirely on the next run.
+
+FileCache is the SQLite store of ExifCache, and can hold any value computed from the contents of a file.
+"""
+import os
+import json
+import sqlite3
+import typing as ty
+
+DEFAULT_CACHE_NAME = '.photobook_exif.sqlite'
+
+
+class FileCache:
+    """SQLite backed cache of values computed from files, keyed by the path, size and modification time of each file.
+    Subclasses set the table name, and how the values are stored as text."""
+    table = 'files'
+    columns = ['path', 'size', 'mtime_ns', 'value']
+
+    def __init__(self, filepath: str) -> None:
+        """Open (or create) the cache database at filepath. Use ':memory:' for a throw-away cache."""
+        self.filepath = filepath
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(filepath)
+        existing = [row[1] for row in self.connection.execute(f'PRAGMA table_info({self.table})')]
+        if existing and existing != self.columns:  # Written by an earlier version, start over.
+            self.connection.execute(f'DROP TABLE {self.table}')
+        self.connection.execute(f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                                'path TEXT PRIMARY KEY, '
+                                'size INTEGER NOT NULL, '
+                                'mtime_ns INTEGER NOT NULL, '
+                                'value TEXT NOT NULL)')
+        self.connection.commit()
+
+    @staticmethod
+    def _key(filepath: str) -> ty.Tuple[str, int, int]:
+        """Return the (path, size, mtime_ns) triple identifying the current version of a file."""
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        return path, stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def encode(value: ty.Any) -> str:
+        return value
+
+    @staticmethod
+    def decode(text: str) -> ty.Any:
+        return text
+
+    def get(self, filepath: str) -> ty.Any:
+        """Return the cached value for filepath, or None if the file is unknown or has changed since it was cached."""
+        path, size, mtime_ns = self._key(filepath)
+        row = self.connection.execute(f'SELECT size, mtime_ns, value FROM {self.table} WHERE path = ?',
+                                      (path,)).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.decode(row[2])
+
+    def put(self, filepath: str, value: ty.Any) -> None:
+        """Store the value for the current version of filepath, replacing any previous entry."""
+        path, size, mtime_ns = self._key(filepath)
+        self.connection.execute(f'INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)',
+                                (path, size, mtime_ns, self.encode(value)))
+
+    def prune(self) -> int:
+        """Remove entries for files that no longer exist. Returns the number of removed entries."""
+        paths = [row[0] for row in self.connection.execute(f'SELECT path FROM {self.table}')]
+        removed = [(path,) for path in paths if not os.path.exists(path)]
+        self.connection.executemany(f'DELETE FROM {self.table} WHERE path = ?', removed)
+        self.connection.commit()
+        return len(removed)
+
+    def commit(self) -> None:
+        """Write pending entries to disk."""
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def __enter__(self) -> 'FileCache':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __str__(self) -> str:
+        return f'<{type(self).__name__}: {self.filepath}: {self.hits} hits and {self.misses} misses.>'
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+class ExifCache(FileCache):
+    """SQLite backed cache of extracted photo tags."""
+    table = 'photos'
+
+    @classmethod
+    def for_store(cls, search: str) -> 'ExifCache':
+        """Open the default cache file located next to the photos matched by a PhotoCollection search pattern."""
+        return cls(os.path.join(os.path.dirname(os.path.abspath(search)), DEFAULT_CACHE_NAME))
+
+    @staticmethod
+    def encode(tags: ty.Dict[str, str]) -> str:
+        return json.dumps(tags)
+
+    @staticmethod
+    def decode(text: str) -> ty.Dict[str, str]:
+        return json.loads(text)
@@ -0,0 +1,229 @@
+"""Minimal, header-only EXIF reader for JPEG files.
+
+exifread.process_file walks every IFD of a file, including MakerNotes and embedded thumbnails, and reads far more
+of the file than the handful of tags in Photo.get_tags. This module only looks at the APP1 (EXIF) segment, and only
+at the IFD entries it needs, and stops as soon as DateTimeOriginal, ExifImageWidth, ExifImageLength and Orientation
+are found. If the EXIF data has no image dimensions, they are taken from the SOF marker of the JPEG instead.
+
+The file is read in small blocks on demand, so that only a few KB of each photo is read from disk.
+
+The returned tags are named and formatted like the printable values of exifread, i.e.
+{'EXIF DateTimeOriginal': '2018:01:19 08:39:51', 'Image Orientation': 'Rotated 90 CW', ...}.
+
+read_frame reads the pixel size and color components of the JPEG data from the SOF marker, and whether it has an Adobe
+APP14 segment, which is what is needed to embed the JPEG data as it is in a PDF, see photobook.pdf.
+"""
+import struct
+import typing as ty
+from collections import namedtuple
+
+BLOCK_SIZE = 4096
+
+# JPEG markers:
+SOI = 0xD8
+EOI = 0xD9
+SOS = 0xDA
+APP1 = 0xE1
+APP14 = 0xEE
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD8))
+
+# TIFF tags:
+ORIENTATION = 0x0112
+EXIF_OFFSET = 0x8769
+DATE_TIME_ORIGINAL = 0x9003
+EXIF_IMAGE_WIDTH = 0xA002
+EXIF_IMAGE_LENGTH = 0xA003
+
+IFD0_TAGS = {ORIENTATION: 'Image Orientation'}
+EXIF_TAGS = {DATE_TIME_ORIGINAL: 'EXIF DateTimeOriginal',
+             EXIF_IMAGE_WIDTH: 'EXIF ExifImageWidth',
+             EXIF_IMAGE_LENGTH: 'EXIF ExifImageLength'}
+WANTED_TAGS = set(IFD0_TAGS.values()) | set(EXIF_TAGS.values())
+
+ORIENTATIONS = {1: 'Horizontal (normal)',
+                2: 'Mirrored horizontal',
+                3: 'Rotated 180',
+                4: 'Mirrored vertical',
+                5: 'Mirrored horizontal then rotated 90 CCW',
+                6: 'Rotated 90 CW',
+                7: 'Mirrored horizontal then rotated 90 CW',
+                8: 'Rotated 90 CCW'}
+
+# The frame header of a JPEG, from its SOF marker, and whether the JPEG has an Adobe APP14 segment:
+Frame = namedtuple('Frame', ['width', 'height', 'components', 'bits', 'adobe'], defaults=(False,))
+
+# TIFF field types: (struct format, size in bytes)
+FIELD_TYPES = {1: ('B', 1), 2: ('s', 1), 3: ('H', 2), 4: ('L', 4), 9: ('l', 4)}
+
+
+class ExifHeaderError(ValueError):
+    """Raised when a file is not a JPEG or has a malformed header."""
+
+
+class BlockReader:
+    """Random access to a binary file, reading and keeping only the fixed size blocks that are actually used."""
+
+    def __init__(self, f: ty.BinaryIO, block_size: int = BLOCK_SIZE) -> None:
+        self.f = f
+        self.block_size = block_size
+        self.blocks = {}
+        self.bytes_read = 0
+
+    def _block(self, index: int) -> bytes:
+        if index not in self.blocks:
+            self.f.seek(index * self.block_size)
+            block = self.f.read(self.block_size)
+            self.bytes_read += len(block)
+            self.blocks[index] = block
+        return self.blocks[index]
+
+    def read(self, offset: int, size: int) -> bytes:
+        """Return size bytes from offset. Raises ExifHeaderError when reading past the end of the file."""
+        first, last = offset // self.block_size, (offset + size - 1) // self.block_size
+        data = b''.join(self._block(index) for index in range(first, last + 1))
+        start = offset - first * self.block_size
+        data = data[start:start + size]
+        if len(data) != size:
+            raise ExifHeaderError('Unexpected end of file.')
+        return data
+
+
+class TiffReader:
+    """Reader for the TIFF structure inside an EXIF APP1 segment."""
+
+    def __init__(self, reader: BlockReader, offset: int) -> None:
+        self.reader = reader
+        self.offset = offset  # Absolute file position of the TIFF header.
+        byte_order = reader.read(offset, 2)
+        if byte_order == b'II':
+            self.endian = '<'
+        elif byte_order == b'MM':
+            self.endian = '>'
+        else:
+            raise ExifHeaderError('Invalid TIFF byte order.')
+
+    def unpack(self, fmt: str, position: int) -> tuple:
+        """Unpack fmt from a position relative to the TIFF header."""
+        fmt = self.endian + fmt
+        return struct.unpack(fmt, self.reader.read(self.offset + position, struct.calcsize(fmt)))
+
+    def first_ifd(self) -> int:
+        return self.unpack('L', 4)[0]
+
+    def entries(self, ifd: int) -> ty.Iterator[ty.Tuple[int, int, int, int]]:
+        """Yield (tag, field_type, count, entry position) for each entry of the IFD at position ifd."""
+        count = self.unpack('H', ifd)[0]
+        for i in range(count):
+            position = ifd + 2 + 12 * i
+            tag, field_type, value_count = self.unpack('HHL', position)
+            yield tag, field_type, value_count, position
+
+    def value(self, field_type: int, count: int, position: int) -> ty.Union[int, str, None]:
+        """Return the (first) value of the IFD entry at position, or None for unsupported field types, like RATIONAL."""
+        if field_type not in FIELD_TYPES:
+            return None
+        fmt, size = FIELD_TYPES[field_type]
+        value_position = position + 8
+        if size * count > 4:
+            value_position = self.unpack('L', value_position)[0]
+        if field_type == 2:
+            raw = self.reader.read(self.offset + value_position, count)
+            return raw.split(b'\x00', 1)[0].decode('ascii', errors='replace').strip()
+        return self.unpack(fmt, value_position)[0]
+
+
+def read_exif_segment(reader: BlockReader, position: int, tags: dict) -> None:
+    """Read the wanted tags from the EXIF payload (after 'Exif\\0\\0') located at position into tags."""
+    tiff = TiffReader(reader, position)
+    exif_ifd = None
+    for tag, field_type, count, entry in tiff.entries(tiff.first_ifd()):
+        if tag in IFD0_TAGS:
+            value = tiff.value(field_type, count, entry)
+            if value is not None:
+                tags[IFD0_TAGS[tag]] = ORIENTATIONS.get(value, str(value))
+        elif tag == EXIF_OFFSET:
+            exif_ifd = tiff.value(field_type, count, entry)
+
+    if exif_ifd is None:
+        return
+
+    for tag, field_type, count, entry in tiff.entries(exif_ifd):
+        if tag in EXIF_TAGS:
+            value = tiff.value(field_type, count, entry)
+            if value is None:  # Left out, and read from the SOF marker or by the exifread fallback of Photo.read_tags.
+                continue
+            tags[EXIF_TAGS[tag]] = str(value)
+            if WANTED_TAGS.issubset(tags):
+                break
+
+
+def iter_segments(reader: BlockReader) -> ty.Iterator[ty.Tuple[int, int, int]]:
+    """Yield (marker, payload position, payload length) of each segment of a JPEG file, up to the start of the scan
+    data. Raises ExifHeaderError if the file is not a JPEG."""
+    if reader.read(0, 2) != b'\xff' + bytes([SOI]):
+        raise ExifHeaderError('Not a JPEG file.')
+
+    position = 2
+    while True:
+        if reader.read(position, 1) != b'\xff':
+            raise ExifHeaderError(f'Expected JPEG marker at position {position}.')
+        marker = reader.read(position + 1, 1)[0]
+        if marker == 0xFF:  # Fill byte.
+            position += 1
+            continue
+        if marker in STANDALONE_MARKERS:
+            position += 2
+            continue
+        if marker in (SOS, EOI):
+            return
+        length = struct.unpack('>H', reader.read(position + 2, 2))[0]
+        yield marker, position + 4, length - 2
+        position += 2 + length
+
+
+def read_tags(f: ty.BinaryIO) -> ty.Tuple[ty.Dict[str, str], int]:
+    """Read the wanted tags from the header of the JPEG file object f.
+
+    Returns the found tags and the number of bytes read from the file. Tags missing from the file are missing from
+    the result, except for the image dimensions which are read from the SOF marker if not present in the EXIF data.
+    """
+    reader = BlockReader(f)
+    tags = {}
+    for marker, payload, _ in iter_segments(reader):
+        if marker == APP1 and 'EXIF DateTimeOriginal' not in tags and reader.read(payload, 6) == b'Exif\x00\x00':
+            read_exif_segment(reader, payload + 6, tags)
+            if WANTED_TAGS.issubset(tags):
+                break
+        elif marker in SOF_MARKERS:
+            width, height = read_frame_segment(reader, payload)[:2]
+            tags.setdefault('EXIF ExifImageWidth', str(width))
+            tags.setdefault('EXIF ExifImageLength', str(height))
+            break
+
+    return tags, reader.bytes_read
+
+
+def read_frame_segment(reader: BlockReader, position: int) -> Frame:
+    """Read the SOF payload located at position."""
+    bits, height, width, components = struct.unpack('>BHHB', reader.read(position, 6))
+    return Frame(width, height, components, bits)
+
+
+def read_frame(f: ty.BinaryIO) -> Frame:
+    """Read the pixel size, number of color components and bits per component of the JPEG file object f from its
+    SOF marker, and whether an Adobe APP14 segment comes before it. Raises ExifHeaderError if there is no SOF marker."""
+    reader = BlockReader(f)
+    adobe = False
+    for marker, payload, length in iter_segments(reader):
+        if marker == APP14 and length >= 5 and reader.read(payload, 5) == b'Adobe':
+            adobe = True
+        elif marker in SOF_MARKERS:
+            return read_frame_segment(reader, payload)._replace(adobe=adobe)
+    raise ExifHeaderError('No SOF marker found.')
+
+
+def read_file_tags(filepath: str) -> ty.Dict[str, str]:
+    """Read the wanted tags from the header of the JPEG at filepath."""
+    with open(filepath, 'rb', buffering=0) as f:
+        return read_tags(f)[0]
@@ -0,0 +1,139 @@
+"""Streaming LaTeX output.
+
+The LatexWriter writes LaTeX straight to a file as the chapters of a book are produced, instead of building a pylatex
+Document of the complete book in memory and serialising it. compile_tex runs the LaTeX compiler on a written file.
+"""
+import os
+import re
+import subprocess
+import typing as ty
+from contextlib import contextmanager
+
+DOCUMENT_CLASS = 'book'
+# One-sided, so that the pages of a book have the same layout whether it is compiled as one document or merged from
+# separately compiled chapters, see Photobook.generate_pdf_parallel:
+DOCUMENT_OPTIONS = ('a4paper', '11pt', 'oneside')
+PAGE_STYLE = 'headings'
+PACKAGES = (('fontenc', 'T1'), ('inputenc', 'utf8'), ('lmodern', None), ('textcomp', None), ('lastpage', None),
+            ('graphicx', None))
+COMPILERS = (('latexmk', ['--pdf']), ('pdflatex', []))
+COMMAND_NAME = re.compile(r'[A-Za-z@]+\*?')
+
+# The same escapes as pylatex.utils.escape_latex:
+SPECIAL_CHARACTERS = str.maketrans({'&': r'\&', '%': r'\%', '$': r'\$', '#': r'\#', '_': r'\_', '{': r'\{', '}': r'\}',
+                                    '~': r'\textasciitilde{}', '^': r'\^{}', '\\': r'\textbackslash{}',
+                                    '\n': '\\newline%\n', '-': '{-}', '\xa0': '~', '[': '{[}', ']': '{]}'})
+
+
+def escape(text: str) -> str:
+    """Escape the characters that are special in LaTeX."""
+    return text.translate(SPECIAL_CHARACTERS)
+
+
+class LatexError(Exception):
+    """Raised when no LaTeX compiler is found."""
+
+
+class LatexWriter:
+    """Writes LaTeX to a text file, one part at a time."""
+
+    def __init__(self, f: ty.TextIO) -> None:
+        self.f = f
+
+    @classmethod
+    @contextmanager
+    def open(cls, filepath: str, packages: ty.Sequence[ty.Tuple[str, ty.Optional[str]]] = PACKAGES,
+             preamble: ty.Sequence[str] = ()) -> ty.Iterator['LatexWriter']:
+        """Write a complete document to filepath. The document is ended when the context exits. See begin."""
+        with open(filepath, 'w', encoding='utf-8') as f:
+            writer = cls(f)
+            writer.begin(packages, preamble)
+            yield writer
+            writer.end()
+
+    def begin(self, packages: ty.Sequence[ty.Tuple[str, ty.Optional[str]]] = PACKAGES,
+              preamble: ty.Sequence[str] = ()) -> None:
+        """Write the preamble and the start of the document.
+
+        Args:
+            packages: (name, options) of each package used.
+            preamble: Additional lines of the preamble.
+        """
+        self.write(f'\\documentclass[{",".join(DOCUMENT_OPTIONS)}]{{{DOCUMENT_CLASS}}}%\n')
+        for name, options in packages:
+            self.write(f'\\usepackage[{options}]{{{name}}}%\n' if options else f'\\usepackage{{{name}}}%\n')
+        self.write(f'\\pagestyle{{{PAGE_STYLE}}}%\n')
+        for line in preamble:
+            self.write(f'{line}%\n')
+        self.write('\\begin{document}%\n\\normalsize%\n')
+
+    def write(self, latex: str) -> None:
+        """Write raw LaTeX."""
+        self.f.write(latex)
+
+    def command(self, name: str, args: ty.Union[str, ty.Sequence[str]] = (),
+                options: ty.Union[str, ty.Sequence[str]] = ()) -> None:
+        """Write the command \\name[options]{arg}... on a line of its own.
+
+        Args:
+            name: The name of the command, without backslash, arguments or options.
+            args: A single argument, or a sequence of arguments.
+            options: A single option, or a sequence of options, which are separated by commas.
+
+        The arguments and options are written as they are. Text must be escaped with escape first."""
+        if not COMMAND_NAME.fullmatch(name):
+            raise ValueError(f'Invalid command name {name!r}. Pass arguments and options as args and options.')
+        args = [args] if isinstance(args, str) else args
+        options = [options] if isinstance(options, str) else options
+        latex = f'\\{name}'
+        if options:
+            latex += f'[{",".join(options)}]'
+        self.write(latex + ''.join(f'{{{arg}}}' for arg in args) + '%\n')
+
+    def section(self, title: str) -> None:
+        self.command('section', escape(title))
+
+    def text(self, text: str) -> None:
+        """Write a paragraph of escaped text."""
+        self.write(f'{escape(text)}%\n')
+
+    def chapter(self, chapter) -> None:
+        """Write a photobook Chapter as a section with its texts and photos, followed by a page break."""
+        self.section(str(chapter.period))
+        for text in chapter.text:
+            self.text(text.text)
+        for photo in chapter.photos:
+            self.write(f'{photo.latex}%\n')
+        self.write('\n')
+        self.command('newpage')
+
+    def end(self) -> None:
+        """Write the end of the document."""
+        self.write('\\end{document}\n')
+
+
+def compile_tex(filepath: str, compiler: str = None, silent: bool = True) -> int:
+    """Compile the LaTeX file at filepath to a PDF next to it, keeping the log and auxiliary files. Returns the number
+    of pages of the PDF.
+
+    The compiler runs in the directory of the file, so several files can be compiled concurrently from threads. If no
+    compiler is given, latexmk is used if installed, and pdflatex otherwise."""
+    filepath = os.path.abspath(filepath)
+    directory, filename = os.path.split(filepath)
+    compilers = ((compiler, []),) if compiler else COMPILERS
+    for name, arguments in compilers:
+        try:
+            result = subprocess.run([name] + arguments + ['--interaction=nonstopmode', filename], cwd=directory,
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except FileNotFoundError:
+            continue
+        if not silent or result.returncode:
+            print(result.stdout.decode(errors='replace'))
+        result.check_returncode()
+        break
+    else:
+        raise LatexError('No LaTeX compiler was found. Install latexmk or pdflatex, or name a compiler.')
+
+    with open(os.path.splitext(filepath)[0] + '.log', encoding='latin-1') as f:
+        match = re.search(r'Output written on .*?\((\d+) pages?', f.read(), re.DOTALL)
+    return int(match.group(1)) if match else 0
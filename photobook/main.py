@@ -1,17 +1,30 @@
-from typing import List, Union
+from typing import List, Union, Dict, Iterator, Tuple, TYPE_CHECKING
 from datetime import datetime, timedelta
+import io
 import os
 import glob
-from collections import Iterable
-import math
+import hashlib
+from collections.abc import Iterable
+from contextlib import contextmanager
+from bisect import bisect_left
+from heapq import merge
+from itertools import islice
+from operator import attrgetter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
 from pylatex import Document, Section, Figure, NoEscape, Package
 from exifread import process_file
-from pylatex.utils import escape_latex
 from PIL import Image
 
-from photobook import tregex
-from photobook.dateparse import parse as dateparse
+from photobook import tregex, exifheader, latex
+from photobook.exifcache import ExifCache
+from photobook.watch import Changes, InputWatcher
+from photobook.latex import LatexWriter, PACKAGES, PAGE_STYLE, compile_tex
+from photobook.dateparse import parse as dateparse, parse_many
+
+if TYPE_CHECKING:  # Both modules import this one.
+    from photobook.derivatives import DerivativeStore
+    from photobook.templates import Page
 
 
 def parse(string: str) -> datetime:
@@ -68,6 +81,7 @@ class Period:
 
 
 class BookContent:
+    __slots__ = ()
     contents = []
     dict_properties = []
 
@@ -103,16 +117,24 @@ class BookContent:
 
 
 class Text(BookContent):
+    __slots__ = ('written_date', 'author', 'period', 'text')
     dict_properties = ('written_date', 'text', 'period', 'author')
 
-    def __init__(self, text: Union[List, str]) -> None:
+    def __init__(self, text: Union[List, str], parsed_dates: Dict[str, datetime] = None) -> None:
+        """A timestamped text entry. parsed_dates can hold already parsed results for the strings returned by
+        Text.date_strings, i.e. from dateparse.parse_many."""
         if isinstance(text, str):
             lines = text.split('\n')
         else:
             lines = text
 
-        match = tregex.name('(?P<timestamp>\d.*\d) (?P<author>.*?)$', lines[0])[0]
-        self.written_date = parse(match['timestamp'])
+        def parse_date(string: str) -> datetime:
+            if parsed_dates and string in parsed_dates:
+                return parsed_dates[string]
+            return parse(string)
+
+        match = self.read_header(lines[0])
+        self.written_date = parse_date(match['timestamp'])
         self.author = match['author']
 
         contents = []
@@ -120,13 +142,7 @@ class Text(BookContent):
         for line in lines:
             line = line.strip('\r\n')
             if line and line[0] == '*':
-                line = line.replace('*', '').strip()
-                if len(line) > 10:
-                    dates = line.split('-')
-                else:
-                    dates = [line, line]
-
-                datetimes = [parse(date) for date in dates]
+                datetimes = [parse_date(date) for date in self.read_period(line)]
                 # We define end-include by adding a day:
                 datetimes[1] = datetimes[1] + timedelta(days=1)
                 found_contents_dates = True
@@ -139,9 +155,33 @@ class Text(BookContent):
         self.period = Period(*datetimes)
         self.text = '\r\n'.join(contents)
 
+    @staticmethod
+    def read_header(line: str) -> Dict[str, str]:
+        """Return the timestamp and author strings of the header line of a text."""
+        return tregex.first_name(r'(?P<timestamp>\d.*\d) (?P<author>.*?)$', line)
+
+    @staticmethod
+    def read_period(line: str) -> List[str]:
+        """Return the start and end date strings of a '*' period line."""
+        line = line.replace('*', '').strip()
+        if len(line) > 10:
+            return line.split('-')
+        else:
+            return [line, line]
+
+    @classmethod
+    def date_strings(cls, lines: List[str]) -> List[str]:
+        """Return all date strings that are parsed when creating a Text from lines."""
+        strings = [cls.read_header(lines[0])['timestamp']]
+        for line in lines:
+            line = line.strip('\r\n')
+            if line and line[0] == '*':
+                strings.extend(cls.read_period(line))
+        return strings
+
     @property
     def text_escape(self) -> str:
-        return escape_latex(self.text)
+        return latex.escape(self.text)
 
     @property
     def timestamp(self) -> datetime:
@@ -149,24 +189,90 @@ class Text(BookContent):
 
 
 class TextCollection:
+    batch_size = 1024  # Number of entries whose dates are parsed together with parse_many.
+
     def __init__(self, text_files: Union[List, str] = None) -> None:
         self.text = []
-        if isinstance(text_files, str):
-            text_files = [text_files]
+        self.files = {}  # The (entry lines, Text) of each read text file, see read_file.
         if text_files:
+            if isinstance(text_files, str):
+                text_files = [text_files]
             for file in text_files:
-                with open(file, 'r', encoding='utf-8') as f:
-                    text = f.readlines()
-                    collection = []
-                    for line in text:
-                        if line[0] == '#':
-                            # Finish previous collection and start new
-                            if collection:
-                                self.text.append(Text(collection))
-                                collection = []
-                        if line:
-                            collection += [line]
-            self.text.append(Text(collection))
+                self.read_file(file)
+
+    @staticmethod
+    def iter_entries(text_files: Union[List, str]) -> Iterator[List[str]]:
+        """Stream the lines of each text file, and yield the non-empty lines of each entry. Entries start at lines
+        beginning with '#'."""
+        if isinstance(text_files, str):
+            text_files = [text_files]
+        for file in text_files:
+            with open(file, 'r', encoding='utf-8') as f:
+                entry = []
+                for line in f:
+                    line = line.rstrip('\r\n')
+                    if not line:
+                        continue
+                    if line[0] == '#' and entry:
+                        # Finish previous entry and start new
+                        yield entry
+                        entry = []
+                    entry.append(line)
+                if entry:
+                    yield entry
+
+    @classmethod
+    def iter_text(cls, text_files: Union[List, str]) -> Iterator[Text]:
+        """Yield a Text for each entry of the text files. See parse_entries."""
+        return cls.parse_entries(cls.iter_entries(text_files))
+
+    @classmethod
+    def parse_entries(cls, entries: Iterable) -> Iterator[Text]:
+        """Yield a Text for each entry. The dates of the entries are parsed in batches of TextCollection.batch_size
+        entries, so only a single batch of entries is held in memory at a time."""
+        entries = iter(entries)
+        while True:
+            batch = list(islice(entries, cls.batch_size))
+            if not batch:
+                break
+            strings = [string for entry in batch for string in Text.date_strings(entry)]
+            parsed_dates = dict(zip(strings, parse_many(strings, full_text=True)))
+            for entry in batch:
+                yield Text(entry, parsed_dates=parsed_dates)
+
+    def read_file(self, file: str) -> Tuple[List[Text], List[Text]]:
+        """Read the texts of a text file, replacing the texts read from it earlier.
+
+        Only the entries that changed since the file was last read are parsed, the Text of every unchanged entry is
+        kept. Returns the removed and the added texts."""
+        previous = {}
+        for lines, text in self.files.pop(file, []):
+            previous.setdefault(lines, []).append(text)
+
+        entries = []
+        for entry in self.iter_entries(file):
+            lines = tuple(entry)
+            kept = previous.get(lines)
+            entries.append((lines, kept.pop() if kept else None))
+        added = list(self.parse_entries(list(lines) for lines, text in entries if text is None))
+        new_texts = iter(added)
+        self.files[file] = [(lines, next(new_texts) if text is None else text) for lines, text in entries]
+
+        removed = [text for texts in previous.values() for text in texts]
+        self._replace(removed, added)
+        return removed, added
+
+    def remove_file(self, file: str) -> List[Text]:
+        """Remove the texts read from a text file. Returns the removed texts."""
+        removed = [text for lines, text in self.files.pop(file, [])]
+        self._replace(removed, [])
+        return removed
+
+    def _replace(self, removed: List[Text], added: List[Text]) -> None:
+        if removed:
+            removed = set(map(id, removed))
+            self.text = [text for text in self.text if id(text) not in removed]
+        self.text.extend(added)
 
     def __contains__(self, item: Union[Text, "TextCollection"]) -> bool:
         assert isinstance(item, (Text, TextCollection))
@@ -216,22 +322,102 @@ class TextCollection:
 
 
 class Photo(BookContent):
+    """A single photo, represented by the few properties needed for building a book.
+
+    Photo objects hold no file handles. The pixel data and the full EXIF dict are only read when explicitly asked
+    for, through Photo.open_image and Photo.exif, and are not kept on the object afterwards."""
+    __slots__ = ('filepath', 'timestamp', 'width', 'height', 'orientation', 'derivative')
+
     get_tags = {'EXIF DateTimeOriginal': 'timestampstr',
                 'EXIF ExifImageWidth': 'width',
                 'EXIF ExifImageLength': 'height',
                 'Image Orientation': 'orientation'}
+    timestamp_format = '%Y:%m:%d %H:%M:%S'
+
+    # The transpose turning the stored pixels upright, for each EXIF orientation:
+    orientation_transposes = {'Horizontal (normal)': None,
+                              'Mirrored horizontal': Image.FLIP_LEFT_RIGHT,
+                              'Rotated 180': Image.ROTATE_180,
+                              'Mirrored vertical': Image.FLIP_TOP_BOTTOM,
+                              'Mirrored horizontal then rotated 90 CCW': Image.TRANSPOSE,
+                              'Rotated 90 CW': Image.ROTATE_270,
+                              'Mirrored horizontal then rotated 90 CW': Image.TRANSVERSE,
+                              'Rotated 90 CCW': Image.ROTATE_90}
+    axis_swapping_transposes = {Image.TRANSPOSE, Image.TRANSVERSE, Image.ROTATE_90, Image.ROTATE_270}
 
     dict_properties = ['filepath', 'width', 'height', 'orientation', 'timestamp']
 
-    def __init__(self, filepath) -> None:
+    def __init__(self, filepath, tags: Dict[str, str] = None) -> None:
+        """A single photo. tags are the values of Photo.get_tags, as returned by Photo.read_tags. If not given, they
+        are read from the EXIF data of the file."""
+        if tags is None:
+            tags = self.read_tags(filepath)
         self.filepath = filepath
-        self.path, file = os.path.split(filepath)
-        self.filename, self.file_extension = os.path.splitext(file)
-        self.image = Image.open(filepath)
-        self.exif = process_file(open(filepath, 'rb'))
-        for tag in self.get_tags:
-            assert tag in self.exif
-            setattr(self, self.get_tags[tag], str(self.exif[tag]))
+        self.timestamp = datetime.strptime(tags['timestampstr'], self.timestamp_format)
+        self.width = int(tags['width'])
+        self.height = int(tags['height'])
+        self.orientation = tags['orientation']
+        self.derivative = None  # A print resolution copy of the photo, see photobook.derivatives.
+
+    @classmethod
+    def tags_from_exif(cls, exif: dict) -> Dict[str, str]:
+        """Extract the values of Photo.get_tags from an exifread tag dict."""
+        tags = {}
+        for tag in cls.get_tags:
+            assert tag in exif
+            tags[cls.get_tags[tag]] = str(exif[tag])
+        return tags
+
+    @classmethod
+    def read_tags(cls, filepath: str) -> Dict[str, str]:
+        """Read the values of Photo.get_tags from the EXIF data of a file.
+
+        Only the JPEG header is read when possible. Files the header reader can't handle fall back to a full
+        exifread.process_file, without MakerNotes."""
+        try:
+            exif = exifheader.read_file_tags(filepath)
+        except exifheader.ExifHeaderError:
+            exif = {}
+        if not all(tag in exif for tag in cls.get_tags):
+            with open(filepath, 'rb') as f:
+                exif = process_file(f, details=False)
+        return cls.tags_from_exif(exif)
+
+    @property
+    def tags(self) -> Dict[str, str]:
+        """The values of Photo.get_tags for this photo, keyed by attribute name."""
+        return {'timestampstr': self.timestampstr,
+                'width': str(self.width),
+                'height': str(self.height),
+                'orientation': self.orientation}
+
+    @property
+    def exif(self) -> dict:
+        """The complete exifread tag dict of the file. Read on every access, and not kept by the Photo."""
+        with open(self.filepath, 'rb') as f:
+            return process_file(f)
+
+    @contextmanager
+    def open_image(self) -> Iterator[Image.Image]:
+        """Open the pixel data of the photo. The image is closed when the context exits."""
+        with Image.open(self.filepath) as image:
+            yield image
+
+    @property
+    def path(self) -> str:
+        return os.path.dirname(self.filepath)
+
+    @property
+    def filename(self) -> str:
+        return os.path.splitext(os.path.basename(self.filepath))[0]
+
+    @property
+    def file_extension(self) -> str:
+        return os.path.splitext(self.filepath)[1]
+
+    @property
+    def timestampstr(self) -> str:
+        return self.timestamp.strftime(self.timestamp_format)
 
     @staticmethod
     def create_args(args):
@@ -253,72 +439,122 @@ class Photo(BookContent):
     @property
     def includegraphics_latex(self) -> str:
         args = ','.join([arg for arg in [self.orientation_latex] if arg])
-        includegraphics = f'\\includegraphics[{args}]{{{self.convert_latex_path(self.path)}/{{{self.convert_latex_path(self.filename)}}}{self.file_extension}}}'
+        if self.derivative:
+            path, filename = os.path.split(self.derivative.filepath)
+            filename, file_extension = os.path.splitext(filename)
+        else:
+            path, filename, file_extension = self.path, self.filename, self.file_extension
+        includegraphics = f'\\includegraphics[{args}]{{{self.convert_latex_path(path)}/{{{self.convert_latex_path(filename)}}}{file_extension}}}'
         return includegraphics
 
     @property
     def orientation_latex(self):
+        if self.derivative and self.derivative.upright:
+            return ''  # The orientation is already applied to the pixels.
         return self.orientation_translator(self.orientation)
 
     def orientation_translator(self, orientation):
         orientation = self.orientation_lookup(orientation)
         latex = 'angle={:d}'
-        direction_lookup = {'CW': lambda x: 360 - x, None: lambda x: x}
+        direction_lookup = {'CW': lambda x: 360 - x, 'CCW': lambda x: x, None: lambda x: x}
         if orientation:
             return latex.format(direction_lookup[orientation['direction']](orientation['angle']))
         else:
             return ''
 
     def orientation_lookup(self, orientation):
-        match = tregex.name('(?:Rotated)? (?P<angle>\d+(?:.\d+)?) ?(?P<direction>\w+)?', orientation)
+        match = tregex.first_name(r'(?:Rotated)? (?P<angle>\d+(?:.\d+)?) ?(?P<direction>\w+)?', orientation)
         if not match:
             return {}
         else:
-            return {'angle': int(match[0]['angle']), 'direction': match[0]['direction']}
+            return {'angle': int(match['angle']), 'direction': match['direction']}
 
     @property
     def filepath_latex(self):
         return (os.path.basename(self.path)).replace("_", "\_");
 
     @property
-    def timestamp(self):
-        return datetime.strptime(self.timestampstr, '%Y:%m:%d %H:%M:%S')
+    def transpose(self) -> Union[int, None]:
+        """The PIL transpose method turning the pixels of the photo upright, or None if they already are."""
+        return self.orientation_transposes.get(self.orientation)
+
+    @property
+    def display_size(self) -> Tuple[int, int]:
+        """The width and height of the photo when displayed in its EXIF orientation."""
+        if self.transpose in self.axis_swapping_transposes:
+            return self.height, self.width
+        return self.width, self.height
 
     @property
     def shape(self) -> str:
         """Return a simple 'portrait', 'landscape' or 'square' depending on the images actual orientation"""
+        width, height = self.display_size
+        if width == height:
+            return 'square'
+        elif width > height:
+            return 'landscape'
+        else:
+            return 'portrait'
 
-        shift = {'portrait': 'landscape', 'landscape': 'portrait', 'square': 'square'}
 
-        if self.width == self.height:
-            shape = 'square'
-        elif self.width > self.height:
-            shape = 'landscape'
-        elif self.width < self.height:
-            shape = 'portrait'
+# The errors raised when reading a photo that is only partly written. ExifHeaderError is a ValueError, as is an empty
+# timestamp, while exifread raises IndexError and tags_from_exif AssertionError for missing data:
+UNREADABLE_ERRORS = (ValueError, IndexError, AssertionError)
 
-        orientation = self.orientation_lookup(self.orientation)
-        if not orientation:
-            shift_from_original = 0
-        else:
-            shift_from_original = math.fmod(orientation['angle'], 180)
 
-        if shift_from_original:
-            shape = shift[shape]
+def read_photo_tags(filepath: str) -> Dict[str, str]:
+    """Read the Photo.get_tags values of a single file. Module level so that it can be sent to worker processes."""
+    return Photo.read_tags(filepath)
+
 
-        return shape
+def try_read_photo_tags(filepath: str) -> Union[Dict[str, str], None]:
+    """Like read_photo_tags, but returns None for files that can't be read."""
+    try:
+        tags = Photo.read_tags(filepath)
+        Photo(filepath, tags=tags)  # Also check that the values can be parsed.
+    except UNREADABLE_ERRORS:
+        return None
+    return tags
 
 
 class PhotoCollection:
-    def __init__(self, searches: List[str] = None):
+    def __init__(self, searches: List[str] = None, cache: ExifCache = None, jobs: int = None,
+                 executor: Executor = None):
+        """A time sorted collection of photos.
+
+        Args:
+            searches: Glob patterns for the photos in the collection.
+            cache: ExifCache used to skip EXIF parsing of unchanged files.
+            jobs: Number of worker processes used for reading EXIF data. None or 1 reads in the current process.
+            executor: An existing concurrent.futures executor used for reading EXIF data. Overrides jobs.
+        """
         self.searches = searches
 
         self.photos = list()
+        self.timestamps = list()  # Sorted index of photo timestamps, matching the order of self.photos.
         if searches:
-            self.add_photos(self.load(searches))
+            self.add_photos(self.load(searches, cache=cache, jobs=jobs, executor=executor))
 
     @staticmethod
-    def load(searches: Union[List, str]) -> List[Photo]:
+    def read_tags(files: List[str], jobs: int = None, executor: Executor = None,
+                  skip_unreadable: bool = False) -> List[Dict[str, str]]:
+        """Read the Photo.get_tags values of files, in the same order as files. The workers only return the compact
+        tag records, so no Photo objects or file handles are sent between processes. With skip_unreadable, the values
+        of files that can't be read are None instead of raising."""
+        read = try_read_photo_tags if skip_unreadable else read_photo_tags
+        if executor is not None:
+            return list(executor.map(read, files, chunksize=max(1, len(files) // 64)))
+        elif jobs and jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                return list(pool.map(read, files, chunksize=max(1, len(files) // (4 * jobs))))
+        else:
+            return [read(file) for file in files]
+
+    @staticmethod
+    def load(searches: Union[List, str], cache: ExifCache = None, jobs: int = None,
+             executor: Executor = None, skip_unreadable: bool = False) -> List[Photo]:
+        """Load the photos matched by searches. With skip_unreadable, files that can't be read, i.e. because they are
+        only partly written, are left out instead of raising."""
         # Get all images (.JPG and .jpg in this example)
         if isinstance(searches, str):
             searches = [searches]
@@ -334,16 +570,38 @@ class PhotoCollection:
         if not files:
             raise FileNotFoundError('No images where found with that search pattern.')
 
+        if cache is not None:
+            tags = [cache.get(file) for file in files]
+        else:
+            tags = [None] * len(files)
+
+        missing = [i for i, file_tags in enumerate(tags) if file_tags is None]
+        if missing:
+            read = PhotoCollection.read_tags([files[i] for i in missing], jobs=jobs, executor=executor,
+                                             skip_unreadable=skip_unreadable)
+            for i, file_tags in zip(missing, read):
+                tags[i] = file_tags
+                if cache is not None and file_tags is not None:
+                    cache.put(files[i], file_tags)
+
+        if cache is not None:
+            cache.commit()
+
         images = []
-        for file in files:
-            images += [Photo(file)]
+        for file, file_tags in zip(files, tags):
+            if file_tags is not None:
+                images += [Photo(file, tags=file_tags)]
 
         return images
 
     def get_photos_from_period(self, period: Period) -> List[Photo]:
         """Get photos from a period. Start Include, end exclude."""
         assert isinstance(period, Period)
-        return [image for image in self.photos if image.timestamp in period]
+        if not period.start or not period.end:
+            return []
+        first = bisect_left(self.timestamps, period.start)
+        last = bisect_left(self.timestamps, period.end, first)
+        return self.photos[first:last]
 
     def __getitem__(self, key):
         return self.photos[key]
@@ -359,8 +617,19 @@ class PhotoCollection:
         return len(self.photos)
 
     def add_photos(self, photos: Union[List[Photo], "PhotoCollection"]) -> None:
-        self.photos.extend(photos)
-        self.photos = sorted(self.photos, key=lambda x: x.timestamp)
+        """Add photos to the collection. The new photos are sorted and merged into the already sorted collection."""
+        new_photos = sorted(photos, key=attrgetter('timestamp'))
+        self.photos = list(merge(self.photos, new_photos, key=attrgetter('timestamp')))
+        self.timestamps = [photo.timestamp for photo in self.photos]
+
+    def remove_photos(self, filepaths: Iterable) -> List[Photo]:
+        """Remove the photos of the given files from the collection. Returns the removed photos."""
+        filepaths = set(filepaths)
+        removed = [photo for photo in self.photos if photo.filepath in filepaths]
+        if removed:
+            self.photos = [photo for photo in self.photos if photo.filepath not in filepaths]
+            self.timestamps = [photo.timestamp for photo in self.photos]
+        return removed
 
     def __add__(self, other) -> "PhotoCollection":
         assert isinstance(other, PhotoCollection)
@@ -373,6 +642,7 @@ class Chapter:
         """A set of images and text for a specific time period that together make a chapter."""
         self.photos = PhotoCollection()
         self.text = TextCollection()
+        self.text_period = Period()  # The combined period of all texts, updated as texts are added.
 
         if photos:
             self.add_photos(photos)
@@ -381,26 +651,25 @@ class Chapter:
 
     def add_photos(self, photos: Union[List[Photo], Photo, PhotoCollection]) -> None:
         assert isinstance(photos, (Iterable, Photo))
-        if not isinstance(photos, Iterable):
+        if isinstance(photos, Photo):
             photos = [photos]
         self.photos.add_photos(photos)
 
     def add_text(self, text: Union[List[Text], Text, TextCollection]) -> None:
         assert isinstance(text, (Iterable, Text))
-        if not isinstance(text, Iterable):
+        if isinstance(text, Text):
             text = [text]
+        text = list(text)
         self.text.add_text(text)
+        for t in text:
+            self.text_period += t.period
 
     @property
     def period(self) -> Period:
         if self.text:
-            periods = Period()
-            for text in self.text:
-                periods += text.period
-            return periods
+            return self.text_period
         elif self.photos:
-            timestamps = [photo.timestamp for photo in self.photos]
-            return Period(min(timestamps), max(timestamps))
+            return Period(self.photos.timestamps[0], self.photos.timestamps[-1])
         else:
             return Period()
 
@@ -408,6 +677,11 @@ class Chapter:
     def timestamp(self) -> datetime:
         return min(self.period)
 
+    @property
+    def signature(self) -> tuple:
+        """The texts and photos of the chapter. Chapters with equal signatures give the same output."""
+        return tuple(str(text) for text in self.text), tuple(str(photo) for photo in self.photos)
+
     def __bool__(self) -> bool:
         return bool(self.photos) or bool(self.text)
 
@@ -419,9 +693,21 @@ class Chapter:
 
 
 class Photobook:  # ChapterCollection
-    def __init__(self, photo_store: str, text_store: str = None) -> None:
-        self.photos = PhotoCollection(photo_store)
+    def __init__(self, photo_store: str, text_store: str = None, cache: Union[str, ExifCache] = None,
+                 jobs: int = None, executor: Executor = None) -> None:
+        """cache is either an ExifCache or the filepath of the cache database used when loading the photo_store. jobs
+        and executor control parallel reading of photo metadata, see PhotoCollection."""
+        if isinstance(cache, str):
+            cache = ExifCache(cache)
+        self.photo_store = photo_store
+        self.text_store = text_store
+        self.cache = cache
+        self.jobs = jobs
+        self.executor = executor
+        self.photos = PhotoCollection(photo_store, cache=cache, jobs=jobs, executor=executor)
         self.text = TextCollection(text_store)
+        self.unreadable = []  # Photo files that could not be read at the last update, see Photobook.update.
+        self.fragments = {}  # {chapter: name of its fragment}, from the last call to write_fragments.
         self.chapters = list()
         self.chapters_from_text_and_images()
 
@@ -436,62 +722,141 @@ class Photobook:  # ChapterCollection
         self.chapters = sorted(self.chapters, key=lambda x: x.timestamp)
 
     def chapters_from_text_and_images(self) -> None:
-        # Run through text and get all matching photos to create chapters.
-        # Create chapters from photo-less text periods.
-        # Create chapters from the remaining, unbroken periods of photos.
-        absolute_start = datetime(1, 1, 1)
-        absolute_end = datetime.now() + timedelta(days=1)
-
-        text_chapters = []  # Combine all overlapping text into single chapters.
-        current_chapter = []
+        """Create the chapters of the book from its texts and photos."""
+        assert not self.chapters
+        self.add_chapters(self.assemble_chapters(self.text, self.photos))
+        assert self.chapters
 
-        # TODO: Figure out why I'm missing a text-chapter...
-        for text in self.text:
-            found_matching_period = False
-            for chapter in text_chapters:
-                if text.period in chapter.period:
-                    chapter.add_text([text])
-                    found_matching_period = True
-                    break
-            # If no overlapping periods are found, add text as new chapter:
-            if not found_matching_period:
+    @staticmethod
+    def assemble_chapters(texts: Iterable, photos: PhotoCollection) -> List[Chapter]:
+        """Combine texts and photos into chapters with a single sorted sweep.
+
+        Texts with overlapping periods are combined into a single chapter, which gets all photos taken within the
+        combined period. Photos in the gaps between the text chapters become chapters of their own."""
+        text_chapters = []
+        chapter_end = None
+        for text in sorted(texts, key=lambda x: x.period.start):
+            if text_chapters and text.period.start < chapter_end:
+                text_chapters[-1].add_text([text])
+                chapter_end = max(chapter_end, text.period.end)
+            else:
                 text_chapters.append(Chapter(text=[text]))
+                chapter_end = text.period.end
 
-        # Get photos for text chapters:
-        for text_chapter in text_chapters:
-            text_chapter.add_photos(self.photos.get_photos_from_period(text_chapter.period))
-
-        # Create chapters for photos in intermittent periods:
-        previous_period_end = absolute_start
-        photo_chapters = []
+        chapters = []
+        timestamps = photos.timestamps
+        position = 0
         for text_chapter in text_chapters:
-            period = Period(previous_period_end, text_chapter.period.start)
-
-            for chapter in photo_chapters:
-                if period in chapter.period:
-                    abs(1)
-            for chapter in text_chapters:
-                if period in chapter.period:
-                    abs(1)
-
-            photo_chapter = Chapter()
-            photo_chapter.add_photos(self.photos.get_photos_from_period(period))
-            if photo_chapter:
-                photo_chapters.append(photo_chapter)
-
-            previous_period_end = text_chapter.period.end
-
-        # Get the photos from the end of last chapter and all the way forward:
-        period = Period(previous_period_end, absolute_end)
-        photo_chapter = Chapter()
-        photo_chapter.add_photos(self.photos.get_photos_from_period(period))
-        if photo_chapter:
-            photo_chapters.append(photo_chapter)
-
-        assert not self.chapters
-        self.add_chapters(text_chapters)
-        self.add_chapters(photo_chapters)
-        assert self.chapters
+            period = text_chapter.period
+            gap_end = bisect_left(timestamps, period.start, position)
+            if gap_end > position:
+                chapters.append(Chapter(photos=photos[position:gap_end]))
+            position = bisect_left(timestamps, period.end, gap_end)
+            if position > gap_end:
+                text_chapter.add_photos(photos[gap_end:position])
+            chapters.append(text_chapter)
+
+        # The photos after the end of the last text chapter:
+        if position < len(photos):
+            chapters.append(Chapter(photos=photos[position:]))
+
+        return chapters
+
+    def update(self, changes: Changes) -> List[Chapter]:
+        """Apply changes to the input files, and recompute the chapters they touch.
+
+        Only the changed entries of changed text files are parsed, and only the photos of added or modified files are
+        read. Photo files that can't be read, i.e. because they are still being written, are left out and listed in
+        Photobook.unreadable, so that they can be retried later.
+
+        The chapters are only reassembled between the closest text chapters before and after the changed texts and
+        photos, as the chapters outside of these can't change. Chapters whose texts and photos are unchanged are kept
+        as they are. Returns the new or changed chapters, which are the only chapters that need new output."""
+        text_files = [self.text_store] if isinstance(self.text_store, str) else list(self.text_store or [])
+        removed_text, added_text = [], []
+        for file in sorted({file for files in changes for file in files if file in text_files}):
+            if file in changes.removed:
+                removed_text.extend(self.text.remove_file(file))
+            else:
+                removed, added = self.text.read_file(file)
+                removed_text.extend(removed)
+                added_text.extend(added)
+
+        photo_changes = Changes(*([file for file in files if file not in text_files] for files in changes))
+        removed_photos = self.photos.remove_photos(photo_changes.removed + photo_changes.modified)
+        new_files = photo_changes.added + photo_changes.modified
+        added_photos = []
+        if new_files:
+            added_photos = PhotoCollection.load([glob.escape(file) for file in new_files], cache=self.cache,
+                                                jobs=self.jobs, executor=self.executor, skip_unreadable=True)
+            self.photos.add_photos(added_photos)
+        read = {photo.filepath for photo in added_photos}
+        self.unreadable = [file for file in new_files if file not in read]
+
+        changed_texts = removed_text + added_text
+        changed_timestamps = [photo.timestamp for photo in removed_photos + added_photos]
+        if not changed_texts and not changed_timestamps:
+            return []
+
+        # The last text chapter ending before, and the first text chapter starting after, all changes. Photos at the
+        # end of a period are not in it, while photos at its start are:
+        start = min([text.period.start for text in changed_texts] + changed_timestamps)
+        end_of_texts = max([text.period.end for text in changed_texts], default=None)
+        end_of_photos = max(changed_timestamps, default=None)
+        first, last = 0, len(self.chapters)
+        for i, chapter in enumerate(self.chapters):
+            if not chapter.text:
+                continue
+            period = chapter.period
+            if period.end <= start:
+                first = i + 1
+            elif ((end_of_texts is None or period.start >= end_of_texts) and
+                  (end_of_photos is None or period.start > end_of_photos)):
+                last = i
+                break
+        window_start = self.chapters[first - 1].period.end if first else None
+        window_end = self.chapters[last].period.start if last < len(self.chapters) else None
+
+        texts = [text for text in self.text if (window_start is None or text.period.start >= window_start) and
+                 (window_end is None or text.period.start < window_end)]
+        timestamps = self.photos.timestamps
+        photos = PhotoCollection()
+        photos.add_photos(self.photos[bisect_left(timestamps, window_start) if window_start else 0:
+                                      bisect_left(timestamps, window_end) if window_end else len(timestamps)])
+
+        previous = {chapter.signature: chapter for chapter in self.chapters[first:last]}
+        modified = set(photo_changes.modified)
+        chapters, rebuilt = [], []
+        for chapter in self.assemble_chapters(texts, photos):
+            signature = chapter.signature
+            if signature in previous and not any(photo.filepath in modified for photo in chapter.photos):
+                chapter = previous[signature]
+            else:
+                rebuilt.append(chapter)
+            chapters.append(chapter)
+        self.chapters[first:last] = chapters
+        return rebuilt
+
+    def create_derivatives(self, store: "DerivativeStore", page: "Page") -> None:
+        """Create print resolution derivatives of all photos, fitted to the text area of page. See
+        photobook.derivatives."""
+        store.create(page, [(photo, page.width_division(1), page.height_division(1)) for photo in self.photos])
+
+    def watch(self, interval: float = 1.0, directory: str = None) -> Iterator[List[Chapter]]:
+        """Watch the photo and text stores for changes, and yield the rebuilt chapters after each change. Changes made
+        before watch is called are not seen. Photos that can't be read yet are read again at the next poll.
+
+        If directory is given, the chapter fragments in directory are written when the watch starts, and the fragments
+        of the rebuilt chapters are rewritten after each change, see write_fragments."""
+        with InputWatcher(self.photo_store, self.text_store, interval=interval) as watcher:
+            if directory is not None:
+                self.write_fragments(directory)
+            for changes in watcher:
+                rebuilt = self.update(changes)
+                watcher.retry(self.unreadable)
+                if directory is not None and rebuilt:
+                    self.write_fragments(directory, chapters=rebuilt)
+                yield rebuilt
 
     def create_tex(self, doc):
         print('Generating latex!')
@@ -511,25 +876,113 @@ class Photobook:  # ChapterCollection
     def generate_pdf_from_chapters(self, path, title) -> None:
         # TODO: Fix this!
         print('Generating pdf!')
-        doc = Document(documentclass='book', document_options=['a4paper', '11pt'])
-        doc.packages.append(Package('graphicx'))
-        doc.default_filepath = path
-        for chapter in self.chapters:
-            with doc.create(Section(str(chapter.period))):
-                for text in chapter.text:
-                    doc.append(text.text_escape)
-                for photo in chapter.photos:
-                    doc.append(NoEscape(photo.latex))
-            doc.append(NoEscape(r'\newpage'))
-
-        doc.generate_pdf()
-        doc.generate_tex()
+        with LatexWriter.open(path + '.tex') as writer:
+            for chapter in self.chapters:
+                writer.chapter(chapter)
+        compile_tex(path + '.tex')
 
         # doc = self.create_tex()
         # doc.default_filepath = path
         # doc.generate_pdf(title, clean=True, clean_tex=True)
         print('Done!')
 
+    def write_fragments(self, directory: str, chapters: List[Chapter] = None) -> Tuple[List[str], List[str]]:
+        """Write the LaTeX of each chapter to a fragment file in directory, named by the hash of its contents.
+
+        Fragments that already exist are not written again, so that their modification time and LaTeX aux files are
+        kept. Fragments of earlier versions of the chapters are removed. If chapters is given, only these chapters
+        are rendered, and the other chapters keep the fragments of the previous call, as after Photobook.update.
+        Returns the names of all fragments in chapter order, and the names of the fragments that were written."""
+        os.makedirs(directory, exist_ok=True)
+        render = None if chapters is None else set(chapters)
+        fragments, written = {}, []
+        for chapter in self.chapters:
+            if render is not None and chapter not in render and chapter in self.fragments:
+                fragments[chapter] = self.fragments[chapter]
+                continue
+            fragment = io.StringIO()
+            LatexWriter(fragment).chapter(chapter)
+            latex = fragment.getvalue()
+            name = f'chapter-{hashlib.sha1(latex.encode("utf-8")).hexdigest()}'
+            filepath = os.path.join(directory, name + '.tex')
+            if not os.path.exists(filepath):
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    f.write(latex)
+                written.append(name)
+            fragments[chapter] = name
+        self.fragments = fragments
+
+        names = list(fragments.values())
+        current = set(names)
+        for file in glob.glob(os.path.join(glob.escape(directory), 'chapter-*')):
+            if os.path.basename(file).split('.')[0] not in current:
+                os.remove(file)
+        return names, written
+
+    @staticmethod
+    def write_fragment_document(filepath: str, fragments: List[str], only: List[str] = None) -> None:
+        """Write the master document including the fragment files to filepath, where fragments are paths relative to
+        the directory of filepath, without extension. If only is given, only these fragments are compiled, and the
+        others keep the pages and numbering from their aux files."""
+        preamble = [f'\\includeonly{{{",".join(only)}}}'] if only is not None else []
+        with LatexWriter.open(filepath, preamble=preamble) as writer:
+            for fragment in fragments:
+                writer.command('include', fragment)
+
+    def generate_pdf_incremental(self, path: str, proof: bool = False, compiler: str = None) -> List[str]:
+        """Generate the book at path.pdf from chapter fragments, see write_fragments. Returns the names of the
+        fragments that changed since the previous run.
+
+        In proof mode, only the changed fragments are compiled. The rest of the book keeps its pages and numbering from
+        the previous run, so a complete build must have been made first."""
+        fragment_directory = f'{os.path.basename(path)}-fragments'
+        names, written = self.write_fragments(os.path.join(os.path.dirname(os.path.abspath(path)), fragment_directory))
+        fragments = [f'{fragment_directory}/{name}' for name in names]
+        only = [f'{fragment_directory}/{name}' for name in written] if proof else None
+        self.write_fragment_document(path + '.tex', fragments, only=only)
+        compile_tex(path + '.tex', compiler=compiler)
+        return written
+
+    @staticmethod
+    def write_chapter_unit(filepath: str, chapter: Chapter, section: int) -> None:
+        """Write a standalone document of a single chapter to filepath, numbered as section number section of the
+        book. The pages of the unit have no page numbers, as these are set when the units are merged."""
+        with LatexWriter.open(filepath) as writer:
+            writer.command('pagestyle', 'empty')
+            writer.command('setcounter', args=['section', str(section - 1)])
+            writer.chapter(chapter)
+
+    @staticmethod
+    def write_merge_document(filepath: str, units: List[str]) -> None:
+        """Write a document merging the PDFs of units in order to filepath, and numbering the merged pages in the page
+        style of the book."""
+        with LatexWriter.open(filepath, packages=PACKAGES + (('pdfpages', None),)) as writer:
+            for unit in units:
+                writer.command('includepdf', args=unit.replace(os.sep, '/'),
+                               options=['pages=-', f'pagecommand={{\\thispagestyle{{{PAGE_STYLE}}}}}'])
+
+    def generate_pdf_parallel(self, path: str, jobs: int = None, compiler: str = None) -> None:
+        """Compile each chapter as a standalone unit concurrently, and merge the units into the book at path.pdf.
+
+        The units are written to the directory path-chapters, and are merged in order by a LaTeX document using
+        pdfpages. The page numbers are set by the merge document, so the page count of the other units is not needed
+        when compiling a unit, and every unit is compiled once. As the book is one-sided, the layout of a page does not
+        depend on the page number, and the merged book has the same pages as generate_pdf_from_chapters."""
+        directory = f'{path}-chapters'
+        os.makedirs(directory, exist_ok=True)
+        units = [os.path.join(os.path.abspath(directory), f'chapter{section:04d}')
+                 for section in range(1, len(self.chapters) + 1)]
+
+        def compile_unit(i: int) -> int:
+            self.write_chapter_unit(units[i] + '.tex', self.chapters[i], section=i + 1)
+            return compile_tex(units[i] + '.tex', compiler=compiler)
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:  # Each unit is compiled by its own LaTeX process.
+            list(pool.map(compile_unit, range(len(units))))
+
+        self.write_merge_document(path + '.tex', [unit + '.pdf' for unit in units])
+        compile_tex(path + '.tex', compiler=compiler)
+
     def generate_pdf(self, path, title) -> None:
         print('Generating pdf!')
         doc = Document(documentclass='book', document_options=['a4paper', '11pt'])
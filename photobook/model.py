@@ -3,32 +3,139 @@ import typing as ty
 import re
 import logging
 
-from photobook.readers import TextStream
+from photobook.readers import Stream
+
+logger = logging.getLogger(__name__)
 
 
 class Content:
+    """A node in a tree of contents.
+
+    Every Content keeps an index of all the contents below it, under each class in their method resolution order.
+    The index is updated through the chain of parents in add_content, so lookups with get_contents_by_type are
+    proportional to the number of results, and reach all depths of the tree.
+    """
     contents: ty.List['Content'] = None
 
     def __init__(self, **kwargs) -> None:
         for k, v in kwargs.items():
             setattr(self, k, v)
         self.contents = list()
+        self._parent: ty.Optional['Content'] = None
+        self._index: ty.Dict[type, ty.List['Content']] = dict()
 
     def add_content(self, content: 'Content') -> None:
         """Add sub-content to this content."""
         self.contents.append(content)
+        content._parent = self
+        indexed = [(t, [content]) for t in type(content).__mro__[:-1]] + list(content._index.items())
+        types = {t for t, _ in indexed}
+        after = dict.fromkeys(types, 0)  # The number of indexed contents after the new content, in document order.
+        child, node = None, self
+        while node is not None:
+            if child is not None:
+                # Contents added below a content that is already attached go before its later siblings:
+                for sibling in reversed(node.contents):
+                    if sibling is child:
+                        break
+                    for t in types:
+                        after[t] += isinstance(sibling, t) + len(sibling._index.get(t, ()))
+            for t, items in indexed:
+                index = node._index.setdefault(t, [])
+                position = len(index) - after[t]
+                index[position:position] = items
+            child, node = node, node._parent
 
     def _get_contents_by_type(self, t: ty.Type['Content']) -> ty.List['Content']:
         """From the current Content.contents, return a list of items matching type t."""
         return [c for c in self.contents if isinstance(c, t)]
 
-    def get_contents_by_type(self, t: ty.Type['Content']) -> ty.List['Content']:
-        """From the current Content.contents, return a list of items matching type t."""
-        return self._get_contents_by_type(t) + [c for content in self.contents for c in content._get_contents_by_type(t)]
+    def get_contents_by_type(self, t: ty.Union[type, ty.Tuple[type, ...]]) -> ty.List['Content']:
+        """Return all contents of type t below the current Content, at any depth.
+
+        The contents are in document order, the order of walk. t can be anything accepted by isinstance. Only plain
+        classes are looked up in the index, others, like tuples of classes and abstract base classes, are tested against
+        every content."""
+        if type(t) is type and t is not object:
+            return list(self._index.get(t, ()))
+        return [c for c in self.walk() if isinstance(c, t)]
+
+    def walk(self) -> ty.Iterator['Content']:
+        """Iterate over all contents below the current Content, depth first in document order."""
+        stack = [iter(self.contents)]
+        while stack:
+            for content in stack[-1]:
+                yield content
+                stack.append(iter(content.contents))
+                break
+            else:
+                stack.pop()
+
+
+class StartPatternDispatch:
+    """Single-pass matching of the start patterns of a set of ContentFinders.
+
+    The start patterns are combined into one alternation, with a named branch per finder, so that a single match
+    both picks the first matching finder and supplies its named groups. The named groups of each branch are renamed
+    to keep them unique. Patterns that can't be combined (numbered backreferences, bytes patterns, conflicting global
+    flags or inline global flags) make the dispatch fall back to matching the finders one by one."""
+    scoped_flags = {re.IGNORECASE: 'i', re.MULTILINE: 'm', re.DOTALL: 's', re.VERBOSE: 'x'}
+
+    def __init__(self, finders: ty.Sequence['ContentFinder'], combine: bool = True) -> None:
+        self.finders = list(finders)
+        self.combine = combine
+        self.branches = {}  # {branch group index: (finder, ((renamed group, original group), ...))}
+        self.pattern = self._combine() if combine else None
+
+    def _combine(self) -> ty.Optional[ty.Pattern]:
+        global_flags = set()
+        alternatives = []
+        branches = {}
+        for i, finder in enumerate(self.finders):
+            pattern, flags = finder.start_pattern.pattern, finder.start_pattern.flags
+            if not isinstance(pattern, str) or re.search(r'\\[1-9]|\(\?\(\d', pattern):
+                return None
+            global_flags.add(flags & ~sum(self.scoped_flags))
+            branch = f'_branch{i}'
+            groups = tuple((f'{branch}_{name}', name) for name in finder.start_pattern.groupindex)
+            renamed = re.sub(r'\(\?P<(\w+)>', lambda m: f'(?P<{branch}_{m.group(1)}>', pattern)
+            renamed = re.sub(r'\(\?P=(\w+)\)', lambda m: f'(?P={branch}_{m.group(1)})', renamed)
+            renamed = re.sub(r'\(\?\((\w+)\)', lambda m: f'(?({branch}_{m.group(1)})', renamed)
+            inline = ''.join(letter for flag, letter in self.scoped_flags.items() if flags & flag)
+            if inline:
+                renamed = f'(?{inline}:{renamed}\n)' if flags & re.VERBOSE else f'(?{inline}:{renamed})'
+            alternatives.append(f'(?P<{branch}>{renamed})')
+            branches[branch] = (finder, groups)
+
+        if not alternatives or len(global_flags) > 1:
+            return None
+        try:
+            pattern = re.compile('|'.join(alternatives), global_flags.pop())
+        except re.error:
+            return None
+        self.branches = {pattern.groupindex[branch]: finder_groups for branch, finder_groups in branches.items()}
+        return pattern
+
+    def match(self, line: str) -> ty.Optional[ty.Tuple['ContentFinder', ty.Dict[str, str]]]:
+        """Return the first finder whose start pattern matches line, with the named groups of the match."""
+        if self.pattern is None:
+            for finder in self.finders:
+                match = finder.start_pattern.match(line)
+                if match:
+                    return finder, match.groupdict()
+            return None
+
+        match = self.pattern.match(line)
+        if not match:
+            return None
+        # The branch group encloses all other groups of the branch, so it is the last group to close:
+        finder, groups = self.branches[match.lastindex]
+        return finder, {name: match.group(renamed) for renamed, name in groups}
 
 
 class ContentFinder:
     """Generic class for finding and returning text file contents."""
+    combine_start_patterns = True  # Match all sub_content_finders with a single combined pattern.
 
     def __init__(self,
                  start_pattern: ty.Pattern,
@@ -41,7 +148,26 @@ class ContentFinder:
         self.content_type = content_type
         self.sub_content_finders = sub_content_finders if sub_content_finders else list()
 
-    def search_stream(self, stream: TextStream, rematch_on_start=False, stop_at_new_start=True) -> Content:
+    @property
+    def sub_content_finders(self) -> ty.List['ContentFinder']:
+        """The finders of the sub contents. Assign a new sequence to change them, which rebuilds the dispatch."""
+        return self._sub_content_finders
+
+    @sub_content_finders.setter
+    def sub_content_finders(self, finders: ty.Sequence['ContentFinder']) -> None:
+        self._sub_content_finders = list(finders)
+        self._dispatch = None
+
+    @property
+    def sub_content_dispatch(self) -> StartPatternDispatch:
+        """The combined start patterns of the sub_content_finders. Built once, and again only if the
+        sub_content_finders are assigned or combine_start_patterns is changed."""
+        if self._dispatch is None or self._dispatch.combine != self.combine_start_patterns:
+            self._dispatch = StartPatternDispatch(self._sub_content_finders, combine=self.combine_start_patterns)
+        return self._dispatch
+
+    def search_stream(self, stream: Stream, rematch_on_start=False, stop_at_new_start=True,
+                      start_properties: ty.Optional[ty.Dict[str, str]] = None) -> Content:
         """Start a sequential search through a text stream.
 
         Args:
@@ -50,19 +176,56 @@ class ContentFinder:
                 re-evaluate the current line for the subcontent?
             stop_at_new_start: When encountering a new start_pattern before end_pattern is met, do we want to break
                 or just continue parsing?
+            start_properties: The named groups of a start_pattern match already made by the parent finder. The
+                content is created from these, and the search continues from the current line of the stream.
         """
+        if start_properties is not None and not self._sub_content_finders:
+            # A leaf content is complete as soon as it is matched, so there is nothing to scan for:
+            logger.info('%s matched %s', self.content_type, start_properties)
+            return self.content_type(**start_properties)
         content = None
+        for found in self._scan(stream, rematch_on_start, stop_at_new_start, start_properties):
+            if content is None:
+                content = found
+            else:
+                content.add_content(found)
+        return content
+
+    def iter_contents(self, stream: Stream, rematch_on_start=False, stop_at_new_start=True) -> ty.Iterator[Content]:
+        """Search the stream like search_stream, but yield each completed sub content as soon as it is found.
+
+        The sub contents are not added to the content of this finder, so only a single sub content is held in memory
+        at a time.
+        """
+        scan = self._scan(stream, rematch_on_start, stop_at_new_start)
+        if next(scan, None) is None:
+            return
+        yield from scan
+
+    def _scan(self, stream: Stream, rematch_on_start=False, stop_at_new_start=True,
+              start_properties: ty.Optional[ty.Dict[str, str]] = None) -> ty.Iterator[Content]:
+        """Yield the content of this finder as soon as its start is found, followed by each completed sub content."""
+        content = None
+        if start_properties is not None:
+            logger.info('%s matched %s', self.content_type, start_properties)
+            content = self.content_type(**start_properties)
+            yield content
+            if not self.sub_content_finders:
+                return
+
+        dispatch = self.sub_content_dispatch if self.sub_content_finders else None
         while True:
             line = stream.get_line()
             if line is None:
                 break
             else:
                 if not content:
-                    if self.start_pattern.match(line):
+                    match = self.start_pattern.match(line)
+                    if match:
 
-                        logging.info(f'{self.content_type} matched "{line}"')
-                        properties = next(self.start_pattern.finditer(line)).groupdict()
-                        content = self.content_type(**properties)
+                        logger.info('%s matched "%s"', self.content_type, line)
+                        content = self.content_type(**match.groupdict())
+                        yield content
                         if not self.sub_content_finders:
                             # If there are no nested levels below this Content, we are done!
                             break
@@ -73,13 +236,11 @@ class ContentFinder:
                         # We are done here!
                         break
                     elif self.sub_content_finders:  # We now go looking for sub_content.
-                        for sub in self.sub_content_finders:
-                            if sub.start_pattern.match(line):
-                                # Backtrack stream to reevaluate current line, and send the stream into the sub_finder
-                                # that matched.
-                                stream.backtrack_reader_number_of_lines(1)
-                                sub_content = sub.search_stream(stream)
-                                content.add_content(sub_content)
+                        found = dispatch.match(line)
+                        if found:
+                            # Hand the match down to the sub_finder, which continues from the next line.
+                            sub, properties = found
+                            yield sub.search_stream(stream, start_properties=properties)
                     elif stop_at_new_start and self.start_pattern.match(line):
                         # Assumes that reaching a start_pattern again means end of current ant start of new.
                         # So we are done here, and need to parse current line again.
@@ -87,8 +248,6 @@ class ContentFinder:
                         stream.backtrack_reader_number_of_lines(1)
                         break
 
-        return content
-
 
 class File(Content):
     """Simplest possible content for the data in an entire file."""
@@ -102,11 +261,16 @@ class FileFinder(ContentFinder):
                                          content_type=File,
                                          sub_content_finders=sub_content_finders)
 
-    def parse_file(self, stream: TextStream) -> Content:
+    def parse_file(self, stream: Stream) -> Content:
         """Given a specific TextStream, parse the contents according to the given sub_content_finders of this particular
         file."""
         return self.search_stream(stream=stream, rematch_on_start=True, stop_at_new_start=False)
 
+    def iter_contents(self, stream: Stream, rematch_on_start=True, stop_at_new_start=False) -> ty.Iterator[Content]:
+        """Yield the top level contents of the file one at a time, in the same order as they would be found by
+        parse_file, without building the File content."""
+        return super(FileFinder, self).iter_contents(stream, rematch_on_start, stop_at_new_start)
+
 
 class TextEntry:
     author: str
@@ -0,0 +1,308 @@
+"""Native PDF output, without LaTeX.
+
+The PdfWriter writes a PDF file object by object as the pages are produced, so memory use does not grow with the size
+of the book. Only the byte offsets of the written objects, and the object numbers of the embedded photos, are kept
+until the cross reference table is written on close.
+
+Photos are embedded with their JPEG data as it is, as DCTDecode image streams, without decoding or encoding any pixels.
+The EXIF orientation is applied by the placement matrix of each image. Text is set in the built-in Helvetica font with
+WinAnsi encoding, so no fonts are embedded.
+
+PdfBook lays out the chapters of a Photobook, or the pages of templates.Template layouts, on the pages of a
+templates.Page.
+"""
+import os
+import shutil
+import zlib
+import typing as ty
+
+from PIL import Image
+
+from photobook import exifheader
+from photobook.main import Photobook, Chapter, Photo
+from photobook.templates import Page, Template, UNITS_PER_INCH
+
+POINTS_PER_INCH = 72
+A4 = Page(height=29.7, width=21.0, unit='cm', margins=2.5)
+
+FONT_NAME = 'F1'
+# Advance widths of the Helvetica glyphs in 1/1000 em, from the Adobe font metrics:
+HELVETICA_WIDTHS = dict(zip(
+    ' !"#$%&\'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~',
+    [278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+     556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+     1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+     667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+     333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+     556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584]))
+HELVETICA_WIDTHS.update({'æ': 889, 'ø': 611, 'å': 556, 'Æ': 1000, 'Ø': 778, 'Å': 667})
+DEFAULT_WIDTH = 556
+
+# The placement matrix of an image filling the box (x, y, width, height), for each transpose turning the stored
+# pixels of a photo upright:
+IMAGE_MATRICES = {
+    None: lambda x, y, w, h: (w, 0, 0, h, x, y),
+    Image.FLIP_LEFT_RIGHT: lambda x, y, w, h: (-w, 0, 0, h, x + w, y),
+    Image.ROTATE_180: lambda x, y, w, h: (-w, 0, 0, -h, x + w, y + h),
+    Image.FLIP_TOP_BOTTOM: lambda x, y, w, h: (w, 0, 0, -h, x, y + h),
+    Image.TRANSPOSE: lambda x, y, w, h: (0, -h, -w, 0, x + w, y + h),
+    Image.ROTATE_270: lambda x, y, w, h: (0, -h, w, 0, x, y + h),
+    Image.TRANSVERSE: lambda x, y, w, h: (0, h, w, 0, x, y),
+    Image.ROTATE_90: lambda x, y, w, h: (0, h, -w, 0, x + w, y),
+}
+
+COLOR_SPACES = {1: '/DeviceGray', 3: '/DeviceRGB', 4: '/DeviceCMYK'}
+
+
+def encode_text(text: str) -> bytes:
+    """Encode text as a PDF string literal in WinAnsi encoding."""
+    encoded = text.encode('cp1252', errors='replace')
+    return b'(' + encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def text_width(text: str, size: float) -> float:
+    """The width of text set in Helvetica at size, in points."""
+    return sum(HELVETICA_WIDTHS.get(character, DEFAULT_WIDTH) for character in text) * size / 1000
+
+
+def wrap_text(text: str, width: float, size: float) -> ty.List[str]:
+    """Break text into lines no wider than width points. Words wider than a line get a line of their own."""
+    lines = []
+    for paragraph in text.splitlines():
+        line = ''
+        for word in paragraph.split():
+            candidate = f'{line} {word}' if line else word
+            if line and text_width(candidate, size) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def number(value: float) -> str:
+    return f'{value:.3f}'.rstrip('0').rstrip('.')
+
+
+class PdfCanvas:
+    """The content of a single page."""
+
+    def __init__(self) -> None:
+        self.operations = []
+        self.images = {}  # Resource name: object number.
+
+    def text(self, x: float, y: float, text: str, size: float) -> None:
+        """Set a line of text with its baseline starting at (x, y)."""
+        self.operations.append(f'BT /{FONT_NAME} {number(size)} Tf {number(x)} {number(y)} Td '.encode('ascii')
+                               + encode_text(text) + b' Tj ET')
+
+    def image(self, image_id: int, matrix: ty.Tuple[float, ...]) -> None:
+        """Draw the image object image_id with the placement matrix of IMAGE_MATRICES."""
+        name = f'Im{image_id}'
+        self.images[name] = image_id
+        self.operations.append(f'q {" ".join(number(value) for value in matrix)} cm /{name} Do Q'.encode('ascii'))
+
+    def content(self) -> bytes:
+        return b'\n'.join(self.operations)
+
+
+class PdfWriter:
+    """Writes a PDF file sequentially, one page at a time."""
+
+    def __init__(self, filepath: str, width: float, height: float) -> None:
+        """Start writing a PDF at filepath, with pages of width by height points."""
+        self.filepath = filepath
+        self.width = width
+        self.height = height
+        self.offsets = []  # The file position of each object, by object number - 1.
+        self.page_ids = []
+        self.images = {}  # Object number of each embedded JPEG file, so that repeated photos are only embedded once.
+        self.f = open(filepath, 'wb')
+        self.f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self.catalog_id = self.reserve()
+        self.pages_id = self.reserve()
+        self.font_id = self.write_object(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                                         b'/Encoding /WinAnsiEncoding >>')
+
+    def reserve(self) -> int:
+        """Reserve an object number for an object written later."""
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def _begin(self, object_id: int = None) -> int:
+        if object_id is None:
+            object_id = self.reserve()
+        self.offsets[object_id - 1] = self.f.tell()
+        self.f.write(f'{object_id} 0 obj\n'.encode('ascii'))
+        return object_id
+
+    def write_object(self, body: bytes, object_id: int = None) -> int:
+        """Write an object, and return its number."""
+        object_id = self._begin(object_id)
+        self.f.write(body + b'\nendobj\n')
+        return object_id
+
+    def write_stream(self, dictionary: str, data: ty.Union[bytes, ty.BinaryIO], length: int) -> int:
+        """Write a stream object with length bytes of data, which is either bytes or a file object to copy from."""
+        object_id = self._begin()
+        self.f.write(f'<< {dictionary} /Length {length} >>\nstream\n'.encode('ascii'))
+        if isinstance(data, bytes):
+            self.f.write(data)
+        else:
+            shutil.copyfileobj(data, self.f)
+        self.f.write(b'\nendstream\nendobj\n')
+        return object_id
+
+    def add_jpeg(self, filepath: str) -> int:
+        """Embed the JPEG file at filepath as an image, without decoding it. Returns its object number."""
+        if filepath not in self.images:
+            with open(filepath, 'rb') as f:
+                frame = exifheader.read_frame(f)
+                if frame.components not in COLOR_SPACES:
+                    raise exifheader.ExifHeaderError(f'Unsupported number of color components in {filepath}.')
+                dictionary = (f'/Type /XObject /Subtype /Image /Width {frame.width} /Height {frame.height} '
+                              f'/ColorSpace {COLOR_SPACES[frame.components]} /BitsPerComponent {frame.bits} '
+                              f'/Filter /DCTDecode')
+                if frame.components == 4 and frame.adobe:
+                    dictionary += ' /Decode [1 0 1 0 1 0 1 0]'  # Adobe CMYK JPEGs are stored inverted.
+                f.seek(0)
+                self.images[filepath] = self.write_stream(dictionary, f, os.fstat(f.fileno()).st_size)
+        return self.images[filepath]
+
+    def add_page(self, canvas: PdfCanvas) -> None:
+        """Write a page with the content of canvas."""
+        content = zlib.compress(canvas.content())
+        content_id = self.write_stream('/Filter /FlateDecode', content, len(content))
+        images = ' '.join(f'/{name} {image_id} 0 R' for name, image_id in canvas.images.items())
+        page = (f'<< /Type /Page /Parent {self.pages_id} 0 R '
+                f'/MediaBox [0 0 {number(self.width)} {number(self.height)}] '
+                f'/Resources << /Font << /{FONT_NAME} {self.font_id} 0 R >> /XObject << {images} >> >> '
+                f'/Contents {content_id} 0 R >>')
+        self.page_ids.append(self.write_object(page.encode('ascii')))
+
+    def close(self) -> None:
+        """Write the page tree, catalog and cross reference table, and close the file."""
+        if self.f.closed:
+            return
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self.page_ids)
+        self.write_object(f'<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>'.encode('ascii'),
+                          self.pages_id)
+        self.write_object(f'<< /Type /Catalog /Pages {self.pages_id} 0 R >>'.encode('ascii'), self.catalog_id)
+        xref = self.f.tell()
+        self.f.write(f'xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n'.encode('ascii'))
+        for offset in self.offsets:
+            self.f.write(f'{offset:010d} 00000 n \n'.encode('ascii'))
+        self.f.write(f'trailer\n<< /Size {len(self.offsets) + 1} /Root {self.catalog_id} 0 R >>\n'
+                     f'startxref\n{xref}\n%%EOF\n'.encode('ascii'))
+        self.f.close()
+
+    def __enter__(self) -> 'PdfWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class PdfBook:
+    """Lays out chapters and template pages on the pages of a PdfWriter."""
+
+    def __init__(self, filepath: str, page: Page = A4, font_size: float = 11, heading_size: float = 16) -> None:
+        self.page = page
+        self.scale = POINTS_PER_INCH / UNITS_PER_INCH[page.unit]  # Points per page unit.
+        self.font_size = font_size
+        self.heading_size = heading_size
+        self.writer = PdfWriter(filepath, page.width * self.scale, page.height * self.scale)
+        self.left = page.left_margin * self.scale
+        self.right = (page.width - page.right_margin) * self.scale
+        self.top = (page.height - page.top_margin) * self.scale
+        self.bottom = page.bottom_margin * self.scale
+        self.spacing = page.spacing * self.scale + font_size
+        self.canvas = None
+        self.y = self.top  # The top of the remaining space on the current page.
+
+    def new_page(self) -> None:
+        """Finish the current page, if any, and start a new one."""
+        if self.canvas is not None:
+            self.writer.add_page(self.canvas)
+        self.canvas = PdfCanvas()
+        self.y = self.top
+
+    def place_photo(self, photo: Photo, x: float, y: float, width: float, height: float) -> None:
+        """Draw photo filling the box with lower left corner (x, y), in points. Uses the derivative of the photo, if
+        any."""
+        if photo.derivative:
+            image_id = self.writer.add_jpeg(photo.derivative.filepath)
+            transpose = None if photo.derivative.upright else photo.transpose
+        else:
+            image_id = self.writer.add_jpeg(photo.filepath)
+            transpose = photo.transpose
+        self.canvas.image(image_id, IMAGE_MATRICES[transpose](x, y, width, height))
+
+    def add_text(self, text: str, size: float) -> None:
+        """Add text at the current position, continuing on new pages as needed."""
+        leading = 1.2 * size
+        for line in wrap_text(text, self.right - self.left, size):
+            if self.y - leading < self.bottom:
+                self.new_page()
+            self.y -= leading
+            self.canvas.text(self.left, self.y + 0.2 * size, line, size)
+        self.y -= self.spacing
+
+    def add_photo(self, photo: Photo) -> None:
+        """Add photo at the current position, at the full text width, or smaller if needed to fit on a page."""
+        display_width, display_height = photo.display_size
+        width = self.right - self.left
+        height = width * display_height / display_width
+        if height > self.top - self.bottom:
+            height = self.top - self.bottom
+            width = height * display_width / display_height
+        if self.y - height < self.bottom:
+            self.new_page()
+        self.y -= height
+        self.place_photo(photo, self.left + (self.right - self.left - width) / 2, self.y, width, height)
+        self.y -= self.spacing
+
+    def add_chapter(self, chapter: Chapter) -> None:
+        """Add a chapter starting on a new page, with a heading, its texts and its photos."""
+        self.new_page()
+        self.add_text(str(chapter.period), self.heading_size)
+        for text in chapter.text:
+            self.add_text(text.text, self.font_size)
+        for photo in chapter.photos:
+            self.add_photo(photo)
+
+    def add_template(self, template: Template) -> None:
+        """Add a page with the photos of a template placed side by side, centered on the page. The template must
+        have a placements method, like L3P."""
+        self.new_page()
+        boxes = []
+        for photo, width, height in template.placements():
+            display_width, display_height = photo.display_size
+            width = width * self.scale if width else height * self.scale * display_width / display_height
+            height = height * self.scale if height else width * display_height / display_width
+            boxes.append((photo, width, height))
+        x = (self.writer.width - sum(width for _, width, _ in boxes)) / 2
+        for photo, width, height in boxes:
+            self.place_photo(photo, x, (self.writer.height - height) / 2, width, height)
+            x += width
+
+    def close(self) -> None:
+        if self.canvas is not None:
+            self.writer.add_page(self.canvas)
+            self.canvas = None
+        self.writer.close()
+
+    def __enter__(self) -> 'PdfBook':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def write_book(book: Photobook, filepath: str, page: Page = A4) -> int:
+    """Write the chapters of book to a PDF at filepath, one chapter at a time. Returns the number of pages."""
+    with PdfBook(filepath, page=page) as pdf:
+        for chapter in book.chapters:
+            pdf.add_chapter(chapter)
+    return len(pdf.writer.page_ids)
@@ -1,8 +1,14 @@
+import io
+import os
+import mmap
+import array
 import codecs
 import abc
 import collections
 import typing as ty
 
+ASCII = bytes(range(128))
+
 
 class Reader:
     """Superclass for all Reader-subclasses."""
@@ -12,6 +18,15 @@ class Reader:
         # noinspection PyUnresolvedReferences
         return self._read_line()
 
+    def close(self) -> None:
+        """Release any resources held by the reader."""
+
+    def __enter__(self) -> 'Reader':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
 
 class ReaderMeta(abc.ABCMeta):
     """Abstract base class for text readers."""
@@ -23,25 +38,34 @@ class ReaderMeta(abc.ABCMeta):
 
 
 class FileReader(Reader, metaclass=ReaderMeta):
-    """Simple reader for reading file contents."""
-    def __init__(self, filepath: str, encoding: str) -> None:
-        self.stream = codecs.open(filename=filepath, encoding=encoding)
+    """Simple reader for reading file contents, using buffered text I/O."""
+    def __init__(self, filepath: str, encoding: str, buffering: int = -1) -> None:
+        self.stream = io.open(filepath, mode='r', encoding=encoding, buffering=buffering)
+
+    def _read_line(self) -> ty.Union[str, None]:
+        """Return the next line of the file without line ending, or None at the end of the file."""
+        line = self.stream.readline()
+        if not line:
+            return None
+        return line.rstrip('\r\n')
 
-    def _read_line(self) -> str:
-        return self.stream.readline()
+    def close(self) -> None:
+        self.stream.close()
 
 
 class StringReader(Reader, metaclass=ReaderMeta):
     """Simple reader for reading string contents."""
     def __init__(self, string: str) -> None:
         self.strings = string.splitlines()
+        self.position = 0
 
-    def _read_line(self) -> str:
+    def _read_line(self) -> ty.Union[str, None]:
         """Return the next line of the string."""
-        try:
-            return self.strings.pop(0)
-        except IndexError:
+        if self.position >= len(self.strings):
             return None
+        line = self.strings[self.position]
+        self.position += 1
+        return line
 
 
 class TextStream:
@@ -72,3 +96,105 @@ class TextStream:
 
     def get_previous_line(self) -> str:
         return self.history[-2]
+
+
+class MappedTextStream:
+    """Text stream backed by a memory-mapped file.
+
+    Instead of copying lines into a history, the stream keeps an index of the byte offset of every line, built lazily
+    as the stream moves forward, and decodes lines on demand by slicing the memory map. Backtracking, looking at the
+    previous line and seeking to any line are O(1) and have no depth limit. The only memory used per line is the
+    8 byte offset in the index.
+
+    Lines are found by searching for the newline byte, so the encoding must be ASCII-compatible, like UTF-8 and
+    Latin-1. Use a TextStream for other encodings, like UTF-16."""
+
+    def __init__(self, filepath: str, encoding: str = 'utf-8') -> None:
+        if not ascii_compatible(encoding):
+            raise ValueError(f'MappedTextStream requires an ASCII-compatible encoding, not {encoding}.')
+        self.encoding = encoding
+        self.file = open(filepath, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        # An empty file can't be memory-mapped:
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.offsets = array.array('Q', [0])  # Start offset of each indexed line, followed by the end of the last.
+        self.indexed = not self.size  # True when self.offsets covers the entire file.
+        self.index = 0  # The number of the next line returned by get_line.
+
+    def _index_next_line(self) -> None:
+        """Extend the line index by one line."""
+        start = self.offsets[-1]
+        newline = self.map.find(b'\n', start)
+        if newline == -1:
+            self.offsets.append(self.size)
+        else:
+            self.offsets.append(newline + 1)
+        if self.offsets[-1] >= self.size:
+            self.indexed = True
+
+    def build_index(self) -> None:
+        """Index all remaining lines of the file in one pass."""
+        while not self.indexed:
+            self._index_next_line()
+
+    @property
+    def line_count(self) -> int:
+        self.build_index()
+        return len(self.offsets) - 1
+
+    def line(self, number: int) -> ty.Union[str, None]:
+        """Return line number (counting from 0) without line ending, or None if it is past the end of the file."""
+        if number < 0:
+            return None
+        while number + 1 >= len(self.offsets) and not self.indexed:
+            self._index_next_line()
+        if number + 1 >= len(self.offsets):
+            return None
+        return self.map[self.offsets[number]:self.offsets[number + 1]].decode(self.encoding).rstrip('\r\n')
+
+    def get_line(self) -> ty.Union[str, None]:
+        """Return the current line for parsing."""
+        line = self.line(self.index)
+        self.index += 1
+        return line
+
+    def get_previous_line(self) -> ty.Union[str, None]:
+        return self.line(self.index - 2)
+
+    def backtrack_reader_number_of_lines(self, number: ty.Optional[int] = 1) -> None:
+        """Reset the stream to continue reading from number lines back."""
+        if number > self.index:
+            raise IndexError('Can not backtrack past the start of the stream.')
+        self.index -= number
+
+    def seek(self, number: int) -> None:
+        """Continue reading from line number."""
+        if number < 0:
+            raise IndexError('Line numbers start at 0.')
+        self.index = number
+
+    def tell(self) -> int:
+        """Return the number of the next line returned by get_line."""
+        return self.index
+
+    def close(self) -> None:
+        if self.size:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self) -> 'MappedTextStream':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def ascii_compatible(encoding: str) -> bool:
+    """Return True if encoding encodes the ASCII characters as single ASCII bytes."""
+    try:
+        return ASCII.decode('ascii').encode(encoding) == ASCII
+    except UnicodeError:
+        return False
+
+
+Stream = ty.Union[TextStream, MappedTextStream]
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Tuple, Optional
 
 from photobook.main import PhotoCollection, TextCollection, Photo
 
@@ -12,6 +12,8 @@ texts.
 
 """
 
+UNITS_PER_INCH = {'in': 1, 'cm': 2.54, 'mm': 25.4, 'pt': 72.27, 'bp': 72}
+
 
 class Page:
     height = None
@@ -51,6 +53,10 @@ class Page:
     def height_division(self, divisions) -> float:
         return (self.height - self.top_margin - self.bottom_margin) / divisions
 
+    def pixels(self, length: float, dpi: int) -> int:
+        """Return the number of pixels covering a length in page units when printed at dpi."""
+        return round(length / UNITS_PER_INCH[self.unit] * dpi)
+
 
 class TemplateLibrary:
     def __init__(self, page_width: int, page_height: int) -> None:
@@ -97,6 +103,11 @@ class L3P(Template):  # Landscape page, 3 Portraits
     # TODO: Get this working according to the last page of album_test_modify.tex
     accepts = ['portrait', 'portrait', 'portrait']
 
+    def placements(self) -> List[Tuple[Photo, Optional[float], Optional[float]]]:
+        """Return the (photo, width, height) of each photo in the layout, in page units. A None width or height is
+        given by the aspect ratio of the photo."""
+        return [(photo, self.page.width_division(3), None) for photo in self.photos]
+
     def latex(self) -> str:
         forced_width = self.page.width_division(3)
         image_width_str = f'{self.page.width_division(3):n}{self.page.unit}'
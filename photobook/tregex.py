@@ -14,49 +14,106 @@
 
 import re
 import difflib
+import heapq
+from collections import OrderedDict, namedtuple
 
 DEFAULT_FLAG = re.UNICODE | re.DOTALL
 NAMED_GROUP_DETECTION = '(\(\?P<\w+>)'
 NAMED_GROUP_REFERANCE_DETECTION = '\(\?\(\w+\)'
 DEFAULT_SEARCH_SCORE_CUTOFF = 0.6
 CONTENT_MATCH_DEFAULT_SCORE = 0.01
+PATTERN_CACHE_SIZE = 512
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
 
 
 class UnknownMethodError(Exception):
     pass
 
 
-def _process(pattern, string, output='smart', flags=DEFAULT_FLAG):
-    # Returns the named groups from a pattern match directly, insted of going
-    # through the regular parsing.
-    r = re.compile(pattern, flags)
-    result = [found for found in r.finditer(string)]
-    if result:
-        return_list = []
+class _PatternCache(object):
+    # Bounded LRU cache of compiled patterns, with hit/miss statistics.
+
+    def __init__(self, maxsize=PATTERN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.patterns = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pattern, flags, rewrite=None):
+        # Return the compiled pattern. rewrite is None, 'match' or 'group', and removes named groups from the pattern
+        # before compiling, as used by the match and group functions.
+        key = (pattern, flags, rewrite)
+        try:
+            compiled = self.patterns[key]
+        except KeyError:
+            self.misses += 1
+            compiled = re.compile(_rewrite(pattern, rewrite), flags)
+            self.patterns[key] = compiled
+            if len(self.patterns) > self.maxsize:
+                self.patterns.popitem(last=False)
+        else:
+            self.hits += 1
+            self.patterns.move_to_end(key)
+        return compiled
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.patterns))
+
+    def clear(self):
+        self.patterns.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def _rewrite(pattern, rewrite):
+    if rewrite == 'match':
+        pattern = re.sub(NAMED_GROUP_DETECTION, '(', pattern)  # Remove named groups.
+        pattern = re.sub(NAMED_GROUP_REFERANCE_DETECTION, '(', pattern)  # Remove named groups.
+    elif rewrite == 'group':
+        pattern = re.sub(NAMED_GROUP_DETECTION, '(', pattern)  # Remove named groups.
+    return pattern
+
+
+_cache = _PatternCache()
+
+
+def cache_info():
+    # Returns hits, misses, maxsize and currsize of the compiled pattern cache.
+    return _cache.info()
 
+
+def cache_clear():
+    _cache.clear()
+
+
+def _iterate(pattern, string, output='smart', flags=DEFAULT_FLAG, rewrite=None):
+    # Lazily yields the matches of a pattern, as named groups, groups or the
+    # matched string, depending on output.
+    r = _cache.get(pattern, flags, rewrite)
+    for m in r.finditer(string):
         if output == 'smart':
-            if result[0].groupdict():
+            if m.groupdict():
                 output = 'name'
-            elif result[0].groups():
+            elif m.groups():
                 output = 'group'
             else:
                 output = ''
 
         if not output:
-            for m in result:
-                return_list += [m.group()]
+            yield m.group()
         elif output == 'name':
-            for m in result:
-                return_list += [m.groupdict()]
+            yield m.groupdict()
         elif output == 'group':
-            for m in result:
-                return_list += [m.groups()]
+            yield m.groups()
         else:
             raise UnknownMethodError("Unknown method {} for argument 'output'.".format(output))
 
-        return return_list
-    else:
-        return []
+
+def _process(pattern, string, output='smart', flags=DEFAULT_FLAG, rewrite=None):
+    # Returns the named groups from a pattern match directly, insted of going
+    # through the regular parsing.
+    return list(_iterate(pattern, string, output=output, flags=flags, rewrite=rewrite))
 
 
 def name(pattern, string, flags=DEFAULT_FLAG):
@@ -66,28 +123,154 @@ def name(pattern, string, flags=DEFAULT_FLAG):
 def match(pattern, string, flags=DEFAULT_FLAG):
     # Only return strings matching pattern, not considering any grouping. Will
     # remove any named groups from pattern before compiling.
-    pattern = re.sub(NAMED_GROUP_DETECTION, '(', pattern)  # Remove named groups.
-    pattern = re.sub(NAMED_GROUP_REFERANCE_DETECTION, '(', pattern)  # Remove named groups.
-    return _process(pattern, string, output='', flags=flags)
+    return _process(pattern, string, output='', flags=flags, rewrite='match')
 
 
 def group(pattern, string, flags=DEFAULT_FLAG):
     # Only return strings matching groups. Will remove any named groups from
     # pattern before compiling.
-
-    pattern = re.sub(NAMED_GROUP_DETECTION, '(', pattern)  # Remove named groups.
-    return _process(pattern, string, output='group', flags=flags)
+    return _process(pattern, string, output='group', flags=flags, rewrite='group')
 
 
 def smart(pattern, string, flags=DEFAULT_FLAG):
     return _process(pattern, string, output='smart', flags=flags)
 
 
+def iter_name(pattern, string, flags=DEFAULT_FLAG):
+    return _iterate(pattern, string, output='name', flags=flags)
+
+
+def iter_match(pattern, string, flags=DEFAULT_FLAG):
+    return _iterate(pattern, string, output='', flags=flags, rewrite='match')
+
+
+def iter_group(pattern, string, flags=DEFAULT_FLAG):
+    return _iterate(pattern, string, output='group', flags=flags, rewrite='group')
+
+
+def iter_smart(pattern, string, flags=DEFAULT_FLAG):
+    return _iterate(pattern, string, output='smart', flags=flags)
+
+
+def first_name(pattern, string, flags=DEFAULT_FLAG):
+    # Returns the named groups of the first match only, or None. Stops
+    # searching at the first match.
+    return next(iter_name(pattern, string, flags=flags), None)
+
+
+def first_match(pattern, string, flags=DEFAULT_FLAG):
+    return next(iter_match(pattern, string, flags=flags), None)
+
+
+def first_group(pattern, string, flags=DEFAULT_FLAG):
+    return next(iter_group(pattern, string, flags=flags), None)
+
+
+def first_smart(pattern, string, flags=DEFAULT_FLAG):
+    return next(iter_smart(pattern, string, flags=flags), None)
+
+
 def similarity(string1, string2):
     # Returns a score based on the degree of match between to strings:
     return difflib.SequenceMatcher(None, string1, string2).ratio()
 
 
+class SearchIndex(object):
+    """Reusable index for fuzzy search in a list of strings.
+
+    The normalised (lower-cased) strings are computed once, and candidates are pruned by their length and by the
+    cheap difflib upper bounds (real_quick_ratio, quick_ratio) before the full ratio is computed. The scores are the
+    same as similarity(search_string, item).
+    """
+
+    def __init__(self, search_list, case_sensitive=False):
+        self.items = list(search_list)
+        self.case_sensitive = case_sensitive
+        if case_sensitive:
+            self.normalised = self.items
+        else:
+            self.normalised = [s.lower() for s in self.items]
+
+    def __len__(self):
+        return len(self.items)
+
+    def _normalise(self, search_string):
+        return search_string if self.case_sensitive else search_string.lower()
+
+    def _top(self, search_string_p, score_cutoff, k):
+        # Return [(score, index)] of the k best items scoring at least score_cutoff, sorted by descending score and
+        # then by index. A min-heap keeps the current top k, and its worst score is used to prune candidates.
+        matcher = difflib.SequenceMatcher(None, search_string_p)
+        # quick_ratio is symmetric, and with the search string as seq2 its character counts are only computed once:
+        bounds = difflib.SequenceMatcher(None, '', search_string_p)
+        length = len(search_string_p)
+        heap = []
+        for index, item in enumerate(self.normalised):
+            if k is not None and len(heap) >= k:
+                # Later items only beat the worst of the current top k by scoring strictly higher.
+                threshold = heap[0][0]
+                strict = True
+            else:
+                threshold = score_cutoff
+                strict = False
+
+            total = length + len(item)
+            bound = 2.0 * min(length, len(item)) / total if total else 1.0  # Equals matcher.real_quick_ratio().
+            if bound < threshold or (strict and bound <= threshold):
+                continue
+            bounds.set_seq1(item)
+            bound = bounds.quick_ratio()
+            if bound < threshold or (strict and bound <= threshold):
+                continue
+            matcher.set_seq2(item)
+            score = matcher.ratio()
+            if score < threshold or (strict and score <= threshold):
+                continue
+
+            if k is not None and len(heap) >= k:
+                heapq.heapreplace(heap, (score, -index))
+            else:
+                heapq.heappush(heap, (score, -index))
+
+        return [(score, -index) for score, index in sorted(heap, reverse=True)]
+
+    def find(self, search_string, score_cutoff=DEFAULT_SEARCH_SCORE_CUTOFF, scores=False, k=None):
+        """Fuzzy name search in the index. Same as find(), but only returns the k best results if k is given."""
+        search_string_p = self._normalise(search_string)
+        top = self._top(search_string_p, score_cutoff, k)
+        scores_sorted = [(score, self.items[index]) for score, index in top]
+
+        # Get the items which have a content match even if the score is too low:
+        # Keep the length of the strings, so that the shortest strings get the highest match:
+        contains_sorted = []
+        if k is None or len(top) < k:  # Otherwise, the content matches are cut off by k.
+            # With less than k results, top holds every item scoring at least score_cutoff:
+            scored = {index for score, index in top}
+            contains_match = [self.items[index] for index, item in enumerate(self.normalised)
+                              if search_string_p in item and index not in scored]
+            contains_sorted = sorted(contains_match, key=lambda x: len(x), reverse=False)
+
+        result = scores_sorted + [(CONTENT_MATCH_DEFAULT_SCORE, item) for item in contains_sorted]
+        if k is not None:
+            result = result[:k]
+
+        if not result:
+            return []
+
+        if scores:
+            return result
+        else:
+            return [item[1] for item in result]
+
+    def find_best(self, search_string, score_cutoff=0, return_scores=False):
+        """Return the best match in the index, or None."""
+        result = self.find(search_string, score_cutoff=score_cutoff, scores=return_scores, k=1)
+        if result:
+            return result[0]
+        else:
+            return None
+
+
 def find_best(search_string, search_list, score_cutoff=0, case_sensitive=False, return_scores=False):
     """Fuzzy name search from a list of strings.
 
@@ -102,15 +285,8 @@ def find_best(search_string, search_list, score_cutoff=0, case_sensitive=False,
     Returns:
         Returns the best match from the search_list
     """
-    result = find(search_string=search_string,
-                  search_list=search_list,
-                  score_cutoff=score_cutoff,
-                  case_sensitive=case_sensitive,
-                  scores=return_scores)
-    if result:
-        return result[0]
-    else:
-        return None
+    index = SearchIndex(search_list, case_sensitive=case_sensitive)
+    return index.find_best(search_string, score_cutoff=score_cutoff, return_scores=return_scores)
 
 
 def find(search_string, search_list, score_cutoff=DEFAULT_SEARCH_SCORE_CUTOFF, case_sensitive=False, scores=False):
@@ -125,33 +301,8 @@ def find(search_string, search_list, score_cutoff=DEFAULT_SEARCH_SCORE_CUTOFF, c
 
 
     Returns:
-        Returns a list of items that sufficiently match the search_string
+        Returns a list of items that sufficiently match the search_string. Use a SearchIndex for repeated searches in
+        the same search_list.
     """
-
-    if not case_sensitive:
-        search_string_p = search_string.lower()
-        search_list_p = [s.lower() for s in search_list]
-    else:
-        search_string_p = search_string
-        search_list_p = search_list
-
-    similarity_scores = [similarity(search_string_p, item) for item in search_list_p]
-    scores_cutoff = [(score, item) for score, item in zip(similarity_scores, search_list) if score >= score_cutoff]
-    scores_sorted = sorted(scores_cutoff, key=lambda x: x[0], reverse=True)
-
-    # Get the items which have a content match even if the score is too low:
-    # Keep the length of the strings, so that the shortest strings get the highest match:
-    contains_match = [orig for orig, case in zip(search_list, search_list_p)
-                      if search_string_p in case
-                      and orig not in [item[1] for item in scores_sorted]]
-    contains_sorted = sorted(contains_match, key=lambda x: len(x), reverse=False)
-
-    result = scores_sorted + [(CONTENT_MATCH_DEFAULT_SCORE, item) for item in contains_sorted]
-
-    if not result:
-        return []
-
-    if scores:
-        return result
-    else:
-        return [item[1] for item in result]
+    index = SearchIndex(search_list, case_sensitive=case_sensitive)
+    return index.find(search_string, score_cutoff=score_cutoff, scores=scores)
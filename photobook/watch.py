@@ -0,0 +1,123 @@
+"""Detection of changes to the inputs of a photobook.
+
+The InputWatcher keeps a snapshot of the size and modification time of every file matched by the photo globs and
+every text file. Comparing a new snapshot with the previous one gives the added, removed and modified inputs, which
+Photobook.update uses to recompute only the chapters affected by the change.
+
+If the optional inotify_simple package is installed, the watched directories are also monitored with inotify, so that
+changes are picked up as soon as they happen instead of at the next poll.
+"""
+import os
+import glob
+import time
+import typing as ty
+from collections import namedtuple
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Not available on all platforms, fall back to polling.
+    INotify = None
+
+Snapshot = ty.Dict[str, ty.Tuple[int, int]]
+
+
+class Changes(namedtuple('Changes', ['added', 'removed', 'modified'])):
+    """Sorted lists of the added, removed and modified input files."""
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+
+class InputWatcher:
+    """Watches the photo globs and text files of a photobook for changes."""
+
+    def __init__(self, photo_store: ty.Union[ty.List[str], str], text_store: ty.Union[ty.List[str], str] = None,
+                 interval: float = 1.0, use_inotify: bool = True) -> None:
+        """Start watching the inputs from their current state.
+
+        Args:
+            photo_store: Glob patterns for the photos.
+            text_store: Text files.
+            interval: Seconds between each poll of the inputs.
+            use_inotify: Wait for inotify events between the polls, if inotify_simple is installed.
+        """
+        self.photo_store = [photo_store] if isinstance(photo_store, str) else list(photo_store or [])
+        self.text_store = [text_store] if isinstance(text_store, str) else list(text_store or [])
+        self.interval = interval
+        self.retries = set()  # Files reported as modified by the next poll, see retry.
+        self.inotify = None
+        if use_inotify and INotify is not None:
+            self.inotify = INotify()
+            watch_flags = flags.CREATE | flags.DELETE | flags.CLOSE_WRITE | flags.MOVED_FROM | flags.MOVED_TO
+            for directory in self.directories():
+                self.inotify.add_watch(directory, watch_flags)
+        self.snapshot = self.scan()
+
+    def directories(self) -> ty.Set[str]:
+        """The existing directories holding the inputs."""
+        paths = self.photo_store + self.text_store
+        return {os.path.dirname(path) or '.' for path in paths if os.path.isdir(os.path.dirname(path) or '.')}
+
+    def files(self) -> ty.List[str]:
+        """All current input files."""
+        files = [file for search in self.photo_store for file in glob.glob(search)]
+        return files + [file for file in self.text_store if os.path.isfile(file)]
+
+    def scan(self) -> Snapshot:
+        """Return the size and modification time of all current input files."""
+        snapshot = {}
+        for file in self.files():
+            try:
+                stat = os.stat(file)
+            except FileNotFoundError:  # Removed since it was found.
+                continue
+            snapshot[file] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def retry(self, files: ty.Iterable[str]) -> None:
+        """Report files as modified by the next poll, even if their size and modification time are unchanged. Used
+        for files that could not be read, i.e. because they were only partly written when they were seen."""
+        self.retries.update(files)
+
+    def poll(self) -> Changes:
+        """Return the changes since the previous poll."""
+        previous, self.snapshot = self.snapshot, self.scan()
+        retries, self.retries = self.retries, set()
+        return Changes(added=sorted(set(self.snapshot) - set(previous)),
+                       removed=sorted(set(previous) - set(self.snapshot)),
+                       modified=sorted(file for file in set(previous) & set(self.snapshot)
+                                       if previous[file] != self.snapshot[file] or file in retries))
+
+    def wait(self, timeout: float = None) -> Changes:
+        """Block until the inputs change and return the changes. The returned changes are empty if timeout seconds
+        pass without any changes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Files to retry are polled after a pause, so that a file that stays unreadable is not retried in a busy loop:
+        changes = Changes([], [], []) if self.retries else self.poll()
+        while not changes:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            step = self.interval if remaining is None else min(self.interval, remaining)
+            if self.inotify is not None:
+                self.inotify.read(timeout=int(step * 1000))  # Returns early when any of the directories change.
+            else:
+                time.sleep(step)
+            changes = self.poll()
+        return changes
+
+    def __iter__(self) -> ty.Iterator[Changes]:
+        while True:
+            yield self.wait()
+
+    def close(self) -> None:
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+    def __enter__(self) -> 'InputWatcher':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
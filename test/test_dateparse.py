@@ -0,0 +1,71 @@
+"""Tests for the date parser."""
+import datetime
+
+from photobook import dateparse
+
+
+def test_parse_cache():
+    parser = dateparse.DateParse(cache_size=2)
+
+    assert parser.parse('16.06.2018 21:00', full_text=True) == datetime.datetime(2018, 6, 16, 21, 0)
+    assert parser.parse('16.06.2018 21:00', full_text=True) == datetime.datetime(2018, 6, 16, 21, 0)
+    assert parser.cache_info() == dateparse.CacheInfo(hits=1, misses=1, maxsize=2, currsize=1)
+
+    # The cache is bounded, and evicts the least recently used result:
+    parser.parse('2018.05.17')
+    parser.parse('2018.05.31')
+    parser.parse('16.06.2018 21:00', full_text=True)
+    assert parser.cache_info() == dateparse.CacheInfo(hits=1, misses=4, maxsize=2, currsize=2)
+
+    parser.cache_clear()
+    assert parser.cache_info() == dateparse.CacheInfo(hits=0, misses=0, maxsize=2, currsize=0)
+
+
+def test_parse_cache_reference_date():
+    parser = dateparse.DateParse()
+    monday = datetime.date(2018, 6, 11)
+    tuesday = datetime.date(2018, 6, 12)
+
+    assert parser.parse('mandag', referenceDate=monday) == datetime.datetime(2018, 6, 11)
+    assert parser.parse('mandag', referenceDate=tuesday) == datetime.datetime(2018, 6, 18)
+    assert parser.parse('mandag', referenceDate=monday) == datetime.datetime(2018, 6, 11)
+    assert parser.cache_info().hits == 1
+
+    # Results relative to today are keyed on the date of today:
+    parser.parse('17. mai')
+    assert all(key[-1] == datetime.date.today() for key in parser.cache)
+
+
+def test_parse_cache_no_match():
+    parser = dateparse.DateParse()
+    result = parser.parse('no date here')
+    assert result == []
+    result.append('modified')
+    assert parser.parse('no date here') == []
+
+
+def test_strict_fast_path():
+    fast = dateparse.DateParse(cache_size=0)
+    full = dateparse.DateParse(cache_size=0, fast_path=False)
+
+    for string in ['16.06.2018 21:00', '16.06.2018 21:00:05', '2018.05.17', '2018.05.17 13:45', ' 2018.05.31 ',
+                   '01.01.2018', '1.3.2018', '17/05/2018', '2018-5-7', '2018-05-17T10:00:00',
+                   '31.02.2018', '01.13.2018', '16.06.18', '16.06.2018 kl 21:00', '17. mai 2018']:
+        assert fast.parse(string, full_text=True) == full.parse(string, full_text=True)
+
+    assert fast.parse_strict('2018.05.17') == datetime.datetime(2018, 5, 17)
+    assert fast.parse_strict('31.02.2018') is None  # Invalid dates are left to the complex search.
+    assert fast.parse_strict('17. mai 2018') is None
+
+    # EXIF timestamps are not understood by the complex search:
+    assert fast.parse('2018:01:19 08:39:51') == datetime.datetime(2018, 1, 19, 8, 39, 51)
+
+
+def test_parse_many():
+    strings = ['16.06.2018 21:00', '2018.05.17', '16.06.2018 21:00', '17. mai 2018', ' 2018.05.31 ', '31.02.2018',
+               'no date here', '1.3.2018', '2018.05.17']
+    expected = [dateparse.parse(string, full_text=True) for string in strings]
+
+    assert dateparse.parse_many(strings, full_text=True) == expected
+    assert dateparse.parse_many(strings, full_text=True, jobs=2, min_strings_per_job=1) == expected
+    assert dateparse.parse_many([]) == []
@@ -0,0 +1,116 @@
+"""Tests for the print resolution derivatives."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from photobook import main as photobook, exifheader
+from photobook import derivatives as derivatives_module
+from photobook.derivatives import DerivativeStore, INDEX_NAME
+from photobook.templates import L3P, Page
+
+BIN = os.path.join(os.path.dirname(__file__), 'bin')
+
+
+def test_derivatives(tmp_path_factory, monkeypatch):
+    directory = str(tmp_path_factory.mktemp('derivatives'))  # Without underscores, for use in LaTeX.
+    photos = photobook.PhotoCollection(os.path.join(BIN, '*.jpg'))
+    page = Page(height=12, width=24, unit='cm', margins=0)
+    layout = L3P(page=page, photos=[photos[0], photos[1], photos[0]])
+    store = DerivativeStore(directory, dpi=100)
+
+    derivatives = store.create(page, layout.placements())
+    assert len(derivatives) == 2  # The repeated photo is only resampled once.
+
+    # 8cm at 100 dpi is 315 pixels, which is the height of the photos in their stored, unrotated orientation:
+    assert [(d.width, d.height) for d in derivatives] == [(560, 315), (420, 315)]
+    for photo, derivative in zip(photos, derivatives):
+        assert photo.derivative == derivative
+        with Image.open(derivative.filepath) as image:
+            assert image.size == (derivative.width, derivative.height)
+            assert [round(dpi) for dpi in image.info['dpi']] == [100, 100]
+    assert os.path.dirname(derivatives[0].filepath).replace('\\', '/') in layout.latex()
+    assert 'angle=270' in photos[0].includegraphics_latex
+
+    # Derivatives are reused across runs, without reading the unchanged originals again:
+    mtimes = [os.stat(d.filepath).st_mtime_ns for d in derivatives]
+    store.close()
+    monkeypatch.setattr(derivatives_module, 'file_digest', None)
+    with ThreadPoolExecutor(2) as executor:
+        store = DerivativeStore(directory, dpi=100, executor=executor)
+        assert store.create(page, layout.placements()) == derivatives
+    assert [os.stat(d.filepath).st_mtime_ns for d in derivatives] == mtimes
+    monkeypatch.undo()
+
+    # Photos that are not larger than their placement are not resampled:
+    assert store.size(photos[2], page, width=24 * 100) is None
+    assert store.prune(keep=derivatives[:1]) == 1
+    assert sorted(os.listdir(directory)) == [os.path.basename(derivatives[0].filepath), INDEX_NAME]
+    store.close()
+
+
+def test_derivatives_of_changed_photos(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('derivatives'))
+    file = os.path.join(directory, 'photo.jpg')
+    page = Page(height=12, width=24, unit='cm', margins=0)
+    store = DerivativeStore(os.path.join(directory, 'store'), dpi=10)
+
+    def create(color):
+        exif = Image.Exif()
+        exif[exifheader.ORIENTATION] = 1
+        exif.get_ifd(exifheader.EXIF_OFFSET)[exifheader.DATE_TIME_ORIGINAL] = '2018:05:17 12:00:00'
+        Image.new('RGB', (640, 480), color).save(file, exif=exif)
+        derivative, = store.create(page, [(photobook.Photo(file), page.width, None)])
+        return derivative
+
+    first = create('red')
+    assert store.index.get(file) == derivatives_module.file_digest(file)
+    # The changed photo is hashed again, and gets a derivative of its own:
+    second = create('blue')
+    assert second.filepath != first.filepath
+    store.close()
+    with Image.open(second.filepath) as image:
+        assert image.getpixel((0, 0))[2] > 200
+
+
+def red_corner(image):
+    """Return the corner of image nearest to the red block."""
+    width, height = image.size
+    corners = {(x, y): image.getpixel((x * (width - 1), y * (height - 1))) for x in (0, 1) for y in (0, 1)}
+    return max(corners, key=lambda corner: corners[corner][0] - corners[corner][2])
+
+
+def test_upright_derivatives(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('derivatives'))
+    page = Page(height=12, width=24, unit='cm', margins=0)
+    store = DerivativeStore(directory, dpi=100, upright=True)
+
+    for orientation in range(1, 9):
+        file = os.path.join(directory, f'orientation{orientation}.jpg')
+        image = Image.new('RGB', (64, 48), 'blue')
+        image.paste('red', (0, 0, 16, 16))
+        exif = Image.Exif()
+        exif[exifheader.ORIENTATION] = orientation
+        exif.get_ifd(exifheader.EXIF_OFFSET)[exifheader.DATE_TIME_ORIGINAL] = '2018:05:17 12:00:00'
+        image.save(file, exif=exif, quality=95)
+
+        photo = photobook.Photo(file)
+        derivatives = store.create(page, [(photo, page.width, None)])
+        if orientation == 1:
+            assert derivatives == [] and photo.derivative is None  # Nothing to do.
+            continue
+
+        derivative, = derivatives
+        assert (derivative.width, derivative.height) == photo.display_size
+        assert photo.orientation_latex == ''
+        with Image.open(file) as source, Image.open(derivative.filepath) as upright:
+            expected = ImageOps.exif_transpose(source)
+            assert upright.size == expected.size
+            assert red_corner(upright) == red_corner(expected)
+
+    # Resampled photos are turned upright as well:
+    photo = photobook.PhotoCollection(os.path.join(BIN, '*.jpg'))[0]
+    derivative, = store.create(page, [(photo, page.width_division(3), None)])
+    assert (derivative.width, derivative.height) == (315, 560)
+    assert photo.includegraphics_latex.startswith(r'\includegraphics[]')
+    store.close()
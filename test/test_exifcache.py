@@ -0,0 +1,64 @@
+"""Tests for the persistent EXIF cache."""
+import os
+import shutil
+import sqlite3
+
+from photobook import main as photobook
+from photobook.exifcache import ExifCache
+
+BIN = os.path.join(os.path.dirname(__file__), 'bin')
+
+
+def test_cache_hits_and_misses(tmp_path):
+    search = os.path.join(BIN, '*.jpg')
+    cache = ExifCache(str(tmp_path / 'cache.sqlite'))
+
+    uncached = photobook.PhotoCollection.load(search)
+    first = photobook.PhotoCollection.load(search, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert len(cache) == 3
+
+    second = photobook.PhotoCollection.load(search, cache=cache)
+    assert (cache.hits, cache.misses) == (3, 3)
+    assert [p.tags for p in second] == [p.tags for p in first] == [p.tags for p in uncached]
+    assert [p.timestamp for p in second] == [p.timestamp for p in uncached]
+    cache.close()
+
+    # The cache persists between sessions:
+    with ExifCache(str(tmp_path / 'cache.sqlite')) as cache:
+        photobook.PhotoCollection.load(search, cache=cache)
+        assert (cache.hits, cache.misses) == (3, 0)
+
+
+def test_cache_invalidation_and_prune(tmp_path):
+    photo = str(tmp_path / 'photo.jpg')
+    shutil.copy(os.path.join(BIN, '2018-01-19-08.39.51.jpg'), photo)
+
+    with ExifCache(str(tmp_path / 'cache.sqlite')) as cache:
+        cache.put(photo, photobook.Photo.read_tags(photo))
+        assert cache.get(photo)['timestampstr'] == '2018:01:19 08:39:51'
+
+        # A modified file is a miss:
+        stat = os.stat(photo)
+        os.utime(photo, (stat.st_atime, stat.st_mtime + 10))
+        assert cache.get(photo) is None
+
+        assert cache.prune() == 0
+        os.remove(photo)
+        assert cache.prune() == 1
+        assert len(cache) == 0
+
+
+def test_cache_of_earlier_version(tmp_path):
+    photo = os.path.join(BIN, '2018-01-19-08.39.51.jpg')
+    connection = sqlite3.connect(str(tmp_path / 'cache.sqlite'))
+    connection.execute('CREATE TABLE photos (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, tags TEXT)')
+    connection.execute('INSERT INTO photos VALUES (?, 0, 0, ?)', (os.path.abspath(photo), '{}'))
+    connection.commit()
+    connection.close()
+
+    # A cache with the mtime in seconds is emptied, and used with the mtime in nanoseconds:
+    with ExifCache(str(tmp_path / 'cache.sqlite')) as cache:
+        assert len(cache) == 0
+        cache.put(photo, {'timestampstr': '2018:01:19 08:39:51'})
+        assert cache.get(photo) == {'timestampstr': '2018:01:19 08:39:51'}
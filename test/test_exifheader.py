@@ -0,0 +1,77 @@
+"""Tests for the header-only EXIF reader."""
+import io
+import os
+import glob
+import struct
+
+import pytest
+from PIL import Image
+from exifread import process_file
+
+from photobook import exifheader
+from photobook.main import Photo
+
+BIN = os.path.join(os.path.dirname(__file__), 'bin')
+
+
+def read(filepath):
+    with open(filepath, 'rb', buffering=0) as f:
+        return exifheader.read_tags(f)
+
+
+def test_matches_exifread():
+    for file in glob.glob(os.path.join(BIN, '*.jpg')):
+        tags, bytes_read = read(file)
+        with open(file, 'rb') as f:
+            exif = process_file(f)
+
+        assert set(tags) == set(Photo.get_tags)
+        assert tags == {tag: str(exif[tag]) for tag in tags}
+        assert bytes_read <= 2 * exifheader.BLOCK_SIZE
+
+
+def test_sof_fallback(tmp_path):
+    file = str(tmp_path / 'no_dimensions.jpg')
+    exif = Image.Exif()
+    exif[exifheader.ORIENTATION] = 3
+    exif.get_ifd(exifheader.EXIF_OFFSET)[exifheader.DATE_TIME_ORIGINAL] = '2018:05:17 12:00:00'
+    Image.new('RGB', (64, 48)).save(file, exif=exif)
+
+    tags, _ = read(file)
+    assert tags == {'Image Orientation': 'Rotated 180',
+                    'EXIF DateTimeOriginal': '2018:05:17 12:00:00',
+                    'EXIF ExifImageWidth': '64',
+                    'EXIF ExifImageLength': '48'}
+
+    photo = Photo(file)
+    assert (photo.width, photo.height, photo.orientation) == (64, 48, 'Rotated 180')
+
+
+def test_unsupported_field_type(tmp_path):
+    # An EXIF segment with the ExifImageWidth as a RATIONAL, which the header reader does not decode:
+    date = b'2018:05:17 12:00:00\x00'
+    ifd0 = struct.pack('<H', 2) + struct.pack('<HHLHH', exifheader.ORIENTATION, 3, 1, 6, 0) + \
+        struct.pack('<HHLL', exifheader.EXIF_OFFSET, 4, 1, 38) + struct.pack('<L', 0)
+    exif_ifd = struct.pack('<H', 3) + struct.pack('<HHLL', exifheader.DATE_TIME_ORIGINAL, 2, len(date), 80) + \
+        struct.pack('<HHLL', exifheader.EXIF_IMAGE_WIDTH, 5, 1, 100) + \
+        struct.pack('<HHLHH', exifheader.EXIF_IMAGE_LENGTH, 3, 1, 48, 0) + struct.pack('<L', 0)
+    tiff = b'II*\x00' + struct.pack('<L', 8) + ifd0 + exif_ifd + date + struct.pack('<LL', 64, 1)
+    payload = b'Exif\x00\x00' + tiff
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48)).save(buffer, format='JPEG')
+    jpeg = buffer.getvalue()
+    file = str(tmp_path / 'rational.jpg')
+    with open(file, 'wb') as f:
+        f.write(jpeg[:2] + b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload + jpeg[2:])
+
+    tags, _ = read(file)
+    with open(file, 'rb') as f:
+        exif = process_file(f)
+    assert str(exif['EXIF ExifImageWidth']) == '64'
+    assert tags == {tag: str(exif[tag]) for tag in Photo.get_tags}  # The width is read from the SOF marker.
+    assert Photo(file).width == 64
+
+
+def test_not_a_jpeg():
+    with pytest.raises(exifheader.ExifHeaderError):
+        read(os.path.join(BIN, 'context.md'))
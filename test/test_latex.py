@@ -0,0 +1,59 @@
+"""Tests for the streaming LaTeX writer."""
+import os
+import io
+
+import pytest
+from pylatex.utils import escape_latex
+
+from photobook import main as photobook
+from photobook.latex import LatexWriter, escape
+
+BIN = os.path.join(os.path.dirname(__file__), 'bin')
+
+
+def test_escape():
+    for text in ['Total cost: $30,000', 'Issue #5 occurs in 30% of all cases', 'a_b {c} ~d^ \\e [f] - g\r\nh\xa0i',
+                 "We saw grandma's car!", 'æøå']:
+        assert escape(text) == escape_latex(text)
+
+
+def test_writer(tmp_path):
+    book = photobook.Photobook(photo_store=os.path.join(BIN, '*.jpg'), text_store=os.path.join(BIN, 'context.md'))
+    filepath = str(tmp_path / 'book.tex')
+
+    with LatexWriter.open(filepath, preamble=[r'\includeonly{a,b}']) as writer:
+        for chapter in book.chapters:
+            writer.chapter(chapter)
+    with open(filepath, encoding='utf-8') as f:
+        tex = f.read()
+
+    preamble, document = tex.split('\\begin{document}%\n')
+    assert preamble.startswith('\\documentclass[a4paper,11pt,oneside]{book}%\n')
+    assert '\\pagestyle{headings}%\n' in preamble
+    assert '\\usepackage{graphicx}%\n' in preamble and '\\includeonly{a,b}%\n' in preamble
+    assert document.endswith('\\end{document}\n')
+    assert document.count('\\section{') == document.count('\\newpage') == len(book.chapters)
+    assert '\\section{<Period: 2018{-}05{-}17 00:00:00 2018{-}05{-}18 00:00:00>}%\nConsitution day was a blast!%\n' \
+           in document
+    for photo in book.photos:
+        assert photo.latex in document
+
+    # A single chapter can be written to any text file:
+    fragment = io.StringIO()
+    LatexWriter(fragment).chapter(book.chapters[1])
+    assert fragment.getvalue() in document
+
+
+def test_command():
+    f = io.StringIO()
+    writer = LatexWriter(f)
+    writer.command('newpage')
+    writer.command('section', escape('A_title'))
+    writer.command('setcounter', args=['page', '7'])
+    writer.command('includepdf', args='unit.pdf', options=['pages=-', 'fitpaper'])
+    assert f.getvalue() == ('\\newpage%\n\\section{A\\_title}%\n\\setcounter{page}{7}%\n'
+                            '\\includepdf[pages=-,fitpaper]{unit.pdf}%\n')
+
+    # Arguments and options can't be passed as part of the name:
+    with pytest.raises(ValueError):
+        writer.command('setcounter{page}', '7')
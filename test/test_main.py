@@ -1,5 +1,16 @@
+import os
+import shutil
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
 from photobook import main as photobook
+from photobook.watch import Changes, InputWatcher
+from photobook.latex import LatexWriter, compile_tex
+
+BIN = os.path.join(os.path.dirname(__file__), 'bin')
 
 def test_Period():
     period1 = photobook.Period(datetime(2018, 1, 1), datetime(2018, 2, 1))
@@ -34,6 +45,209 @@ def test_Photobook():
     pass
 
 
+def test_Photobook_chapters():
+    # The chapters of the bundled fixtures, as assembled before the sweep-line implementation:
+    book = photobook.Photobook(photo_store=os.path.join(BIN, '*.jpg'), text_store=os.path.join(BIN, 'context.md'))
+
+    assert [chapter.period for chapter in book.chapters] == [
+        photobook.Period(datetime(2018, 1, 1), datetime(2018, 3, 2)),
+        photobook.Period(datetime(2018, 4, 8, 9, 24, 39), datetime(2018, 4, 8, 9, 24, 39)),
+        photobook.Period(datetime(2018, 5, 17), datetime(2018, 5, 18)),
+        photobook.Period(datetime(2018, 5, 31), datetime(2018, 6, 1))]
+    assert [[p.filename for p in chapter.photos] for chapter in book.chapters] == [
+        ['2018-01-19-08.39.51', '2018-02-28-09.12.22'], ['2018-04-08-09.24.39'], [], []]
+    assert [len(chapter.text) for chapter in book.chapters] == [1, 0, 1, 1]
+
+
+def test_Photobook_overlapping_text(tmp_path):
+    text_file = tmp_path / 'overlapping.md'
+    text_file.write_text("""# 16.06.2018 21:00 Tobias
+* 01.01.2018-01.02.2018
+
+Winter.
+
+# 16.06.2018 21:01 Tobias
+* 15.01.2018-20.02.2018
+
+Late winter, overlapping the first.
+
+# 16.06.2018 21:02 Tobias
+* 2018.04.08
+
+Spring.
+""", encoding='utf-8')
+    book = photobook.Photobook(photo_store=os.path.join(BIN, '*.jpg'), text_store=str(text_file))
+
+    assert [chapter.period for chapter in book.chapters] == [
+        photobook.Period(datetime(2018, 1, 1), datetime(2018, 2, 21)),
+        photobook.Period(datetime(2018, 2, 28, 9, 12, 22), datetime(2018, 2, 28, 9, 12, 22)),
+        photobook.Period(datetime(2018, 4, 8), datetime(2018, 4, 9))]
+    assert [len(chapter.text) for chapter in book.chapters] == [2, 0, 1]
+    assert [len(chapter.photos) for chapter in book.chapters] == [1, 1, 1]
+
+
+def test_Photobook_update(tmp_path):
+    for name in ['2018-01-19-08.39.51.jpg', '2018-02-28-09.12.22.jpg', 'context.md']:
+        shutil.copy(os.path.join(BIN, name), str(tmp_path / name))
+    photo_store, text_store = str(tmp_path / '*.jpg'), str(tmp_path / 'context.md')
+    book = photobook.Photobook(photo_store=photo_store, text_store=text_store)
+    watcher = InputWatcher(photo_store, text_store, use_inotify=False)
+    assert not watcher.poll()
+    first, *_, last = book.chapters
+
+    # A new photo gives a new chapter, and leaves the others as they were:
+    shutil.copy(os.path.join(BIN, '2018-04-08-09.24.39.jpg'), str(tmp_path / 'new.jpg'))
+    changes = watcher.poll()
+    assert changes == Changes(added=[str(tmp_path / 'new.jpg')], removed=[], modified=[])
+    assert [chapter.photos[0].filename for chapter in book.update(changes)] == ['new']
+    assert len(book.chapters) == 4
+    assert book.chapters[0] is first and book.chapters[-1] is last
+
+    # Editing a text only rebuilds its own chapter:
+    text = (tmp_path / 'context.md').read_text(encoding='utf-8')
+    (tmp_path / 'context.md').write_text(text.replace('grandma', 'grandpa'), encoding='utf-8')
+    rebuilt = book.update(watcher.poll())
+    assert [chapter.text[0].text for chapter in rebuilt] == ["We saw grandpa's car!"]
+    assert book.chapters[0] is first
+
+    # Removing a photo rebuilds the chapter it was in:
+    os.remove(str(tmp_path / '2018-02-28-09.12.22.jpg'))
+    rebuilt = book.update(watcher.poll())
+    assert [len(chapter.photos) for chapter in rebuilt] == [1]
+    assert rebuilt[0].period == first.period
+    assert len(book.photos) == 2
+
+    # The incremental chapters are the same as those of a complete assembly:
+    assert [chapter.signature for chapter in book.chapters] == \
+           [chapter.signature for chapter in book.assemble_chapters(book.text, book.photos)]
+
+
+def test_Photobook_watch_fragments(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('watch')  # Without underscores, for use in LaTeX.
+    for name in ['2018-01-19-08.39.51.jpg', '2018-02-28-09.12.22.jpg', 'context.md']:
+        shutil.copy(os.path.join(BIN, name), str(tmp_path / name))
+    text_file = tmp_path / 'context.md'
+    book = photobook.Photobook(photo_store=str(tmp_path / '*.jpg'), text_store=str(text_file))
+    directory = str(tmp_path / 'fragments')
+    updates = book.watch(interval=0.01, directory=directory)
+
+    def edit():
+        mtimes.update((name, os.stat(os.path.join(directory, name)).st_mtime_ns) for name in os.listdir(directory))
+        text = text_file.read_text(encoding='utf-8')
+        text_file.write_text(text.replace('grandma', 'grandmother'), encoding='utf-8')
+
+    # The fragments are written when the watch starts, and an edited text only rewrites the fragment of its chapter:
+    mtimes = {}
+    timer = threading.Timer(0.5, edit)
+    timer.start()
+    rebuilt = next(updates)
+    timer.join()
+    updates.close()
+    assert len(rebuilt) == 1 and len(mtimes) == len(book.chapters)
+    files = sorted(os.listdir(directory))
+    new = [name for name in files if name not in mtimes]
+    assert len(new) == 1 and len(files) == len(book.chapters)
+    assert all(os.stat(os.path.join(directory, name)).st_mtime_ns == mtimes[name] for name in files if name in mtimes)
+    assert 'grandmother' in open(os.path.join(directory, new[0]), encoding='utf-8').read()
+
+
+def test_Photobook_update_partial_photo(tmp_path):
+    shutil.copy(os.path.join(BIN, 'context.md'), str(tmp_path / 'context.md'))
+    photo_store, text_store = str(tmp_path / '*.jpg'), str(tmp_path / 'context.md')
+    shutil.copy(os.path.join(BIN, '2018-01-19-08.39.51.jpg'), str(tmp_path / 'first.jpg'))
+    book = photobook.Photobook(photo_store=photo_store, text_store=text_store)
+    watcher = InputWatcher(photo_store, text_store, use_inotify=False)
+
+    # A photo that is still being written is skipped, and read again at the next poll:
+    with open(os.path.join(BIN, '2018-04-08-09.24.39.jpg'), 'rb') as f:
+        data = f.read()
+    new = str(tmp_path / 'new.jpg')
+    with open(new, 'wb') as f:
+        f.write(data[:3])
+    assert book.update(watcher.poll()) == []
+    assert book.unreadable == [new]
+    watcher.retry(book.unreadable)
+    assert watcher.poll() == Changes(added=[], removed=[], modified=[new])
+
+    with open(new, 'wb') as f:
+        f.write(data)
+    rebuilt = book.update(watcher.poll())
+    assert [photo.filename for chapter in rebuilt for photo in chapter.photos] == ['new']
+    assert book.unreadable == []
+    assert len(book.photos) == 2
+
+
+def test_Photobook_chapter_unit(tmp_path):
+    book = photobook.Photobook(photo_store=os.path.join(BIN, '*.jpg'), text_store=os.path.join(BIN, 'context.md'))
+
+    book.write_chapter_unit(str(tmp_path / 'unit.tex'), book.chapters[2], section=3)
+    tex = (tmp_path / 'unit.tex').read_text(encoding='utf-8')
+    assert '\\setcounter{section}{2}' in tex
+    assert '\\pagestyle{empty}' in tex
+    assert tex.count('\\section{') == 1
+    assert 'Consitution day was a blast!' in tex
+
+    # The merge document numbers the pages of the units in the page style of the book:
+    book.write_merge_document(str(tmp_path / 'book.tex'), [str(tmp_path / 'a.pdf'), str(tmp_path / 'b.pdf')])
+    tex = (tmp_path / 'book.tex').read_text(encoding='utf-8')
+    assert tex.count('\\includepdf[pages=-,pagecommand={\\thispagestyle{headings}}]{') == 2
+    assert '\\usepackage{pdfpages}' in tex
+    with LatexWriter.open(str(tmp_path / 'serial.tex')):
+        pass
+    serial = (tmp_path / 'serial.tex').read_text(encoding='utf-8')
+    assert '\\pagestyle{headings}' in serial
+    assert serial.split('\n')[0] == tex.split('\n')[0] == '\\documentclass[a4paper,11pt,oneside]{book}%'
+
+
+@pytest.mark.skipif(shutil.which('pdflatex') is None, reason='LaTeX is not installed.')
+def test_Photobook_generate_pdf_parallel(tmp_path):
+    book = photobook.Photobook(photo_store=os.path.join(BIN, '*.jpg'), text_store=os.path.join(BIN, 'context.md'))
+
+    book.generate_pdf_parallel(str(tmp_path / 'book'), jobs=2)
+    assert os.path.exists(str(tmp_path / 'book.pdf'))
+    assert len(os.listdir(str(tmp_path / 'book-chapters'))) > len(book.chapters)
+
+    # The merged book has the pages of the book compiled as one document:
+    book.generate_pdf_from_chapters(str(tmp_path / 'serial'), title='serial')
+    pages = [compile_tex(str(tmp_path / name)) for name in ['book.tex', 'serial.tex']]
+    assert pages[0] == pages[1] > 0
+
+
+def test_Photobook_fragments(tmp_path):
+    text_file = tmp_path / 'context.md'
+    shutil.copy(os.path.join(BIN, 'context.md'), str(text_file))
+    book = photobook.Photobook(photo_store=os.path.join(BIN, '*.jpg'), text_store=str(text_file))
+    directory = str(tmp_path / 'fragments')
+
+    names, written = book.write_fragments(directory)
+    assert names == written and len(set(names)) == len(book.chapters)
+    mtimes = {name: os.stat(os.path.join(directory, name + '.tex')).st_mtime_ns for name in names}
+
+    # Only the fragment of the changed chapter is written again:
+    text_file.write_text(text_file.read_text(encoding='utf-8').replace('grandma', 'grandpa'), encoding='utf-8')
+    book = photobook.Photobook(photo_store=os.path.join(BIN, '*.jpg'), text_store=str(text_file))
+    new_names, written = book.write_fragments(directory)
+    assert new_names[:-1] == names[:-1] and written == new_names[-1:] != names[-1:]
+    assert {name: os.stat(os.path.join(directory, name + '.tex')).st_mtime_ns for name in names[:-1]} == \
+           {name: mtimes[name] for name in names[:-1]}
+    assert sorted(os.listdir(directory)) == sorted(name + '.tex' for name in new_names)
+
+    fragments = [f'fragments/{name}' for name in new_names]
+    book.write_fragment_document(str(tmp_path / 'book.tex'), fragments, only=[f'fragments/{written[0]}'])
+    tex = (tmp_path / 'book.tex').read_text(encoding='utf-8')
+    assert tex.count('\\include{fragments/chapter-') == len(book.chapters)
+    assert f'\\includeonly{{fragments/{written[0]}}}' in tex.split('\\begin{document}')[0]
+
+
+@pytest.mark.skipif(shutil.which('pdflatex') is None, reason='LaTeX is not installed.')
+def test_Photobook_generate_pdf_incremental(tmp_path):
+    book = photobook.Photobook(photo_store=os.path.join(BIN, '*.jpg'), text_store=os.path.join(BIN, 'context.md'))
+
+    assert len(book.generate_pdf_incremental(str(tmp_path / 'book'))) == len(book.chapters)
+    assert book.generate_pdf_incremental(str(tmp_path / 'book'), proof=True) == []
+    assert os.path.exists(str(tmp_path / 'book.pdf'))
+
+
 def test_photos():
     img = photobook.PhotoCollection.load(r"E:\Dropbox\Tobias\Programming\photobook\test\bin\*.jpg")
 
@@ -61,6 +275,43 @@ def test_PhotoCollection():
 
     assert 2*len(collection) == len(collection+collection2)
 
+def test_PhotoCollection_index():
+    collection = photobook.PhotoCollection(os.path.join(BIN, '2018-04*.jpg'))
+    collection.add_photos(photobook.PhotoCollection.load(os.path.join(BIN, '2018-0[12]*.jpg')))
+
+    assert [p.filename for p in collection] == ['2018-01-19-08.39.51', '2018-02-28-09.12.22', '2018-04-08-09.24.39']
+    assert collection.timestamps == sorted(p.timestamp for p in collection)
+
+    period = photobook.Period(datetime(2018, 1, 19, 8, 39, 51), datetime(2018, 4, 8, 9, 24, 39))
+    assert [p.filename for p in collection.get_photos_from_period(period)] == ['2018-01-19-08.39.51',
+                                                                               '2018-02-28-09.12.22']
+    assert collection.get_photos_from_period(photobook.Period(datetime(2018, 3, 1), datetime(2018, 4, 1))) == []
+    assert collection.get_photos_from_period(photobook.Period()) == []
+
+def test_PhotoCollection_parallel():
+    search = os.path.join(BIN, '*.jpg')
+    serial = photobook.PhotoCollection.load(search)
+    parallel = photobook.PhotoCollection.load(search, jobs=2)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        threaded = photobook.PhotoCollection.load(search, executor=executor)
+
+    assert [p.filepath for p in parallel] == [p.filepath for p in threaded] == [p.filepath for p in serial]
+    assert [p.tags for p in parallel] == [p.tags for p in threaded] == [p.tags for p in serial]
+
+def test_Photo_is_handle_free():
+    photo = photobook.Photo(os.path.join(BIN, '2018-01-19-08.39.51.jpg'))
+
+    with pytest.raises(AttributeError):
+        photo.image = None  # Photo is a slim __slots__ record.
+    assert (photo.width, photo.height, photo.orientation) == (5312, 2988, 'Rotated 90 CW')
+    assert photo.timestamp == datetime(2018, 1, 19, 8, 39, 51)
+    assert photo.tags == photobook.Photo.read_tags(photo.filepath)
+    assert str(photo.exif['EXIF DateTimeOriginal']) == photo.timestampstr
+
+    with photo.open_image() as image:
+        assert image.size == (5312, 2988)
+    assert image.fp is None  # Closed when leaving the context.
+
 def test_Text():
     match = """16.06.2018 21:00 Tobias
 ====================
@@ -93,4 +344,23 @@ def test_TextCollection():
                0].text == 'It was a really, really cold winter. Everything was covered in deep, white snow for months. Most winters were dark, but because of all the snow, this winter was bright and crisp and clean.'
 
     assert collection[1] in collection
-    assert not photobook.Text(['# 20.11.2015 12:20 Tobias', '* 13.11.13', 'This text is not in collection']) in collection
\ No newline at end of file
+    assert not photobook.Text(['# 20.11.2015 12:20 Tobias', '* 13.11.13', 'This text is not in collection']) in collection
+
+def test_TextCollection_files(tmp_path, monkeypatch):
+    extra = tmp_path / 'extra.md'
+    extra.write_text('# 17.06.2018 10:00 Tobias\r\n* 2018.07.01\r\n\r\nSummer!\r\n', encoding='utf-8')
+    files = [os.path.join(BIN, 'context.md'), str(extra)]
+
+    entries = list(photobook.TextCollection.iter_entries(files))
+    assert [entry[0] for entry in entries] == ['# 16.06.2018 21:00 Tobias', '# 16.06.2018 21:02 Tobias',
+                                               '# 16.06.2018 21:03 Tobias', '# 17.06.2018 10:00 Tobias']
+
+    # Every file is included, also across parse batches:
+    monkeypatch.setattr(photobook.TextCollection, 'batch_size', 3)
+    collection = photobook.TextCollection(files)
+    assert [text.text for text in collection] == ['It was a really, really cold winter. Everything was covered in '
+                                                  'deep, white snow for months. Most winters were dark, but because '
+                                                  'of all the snow, this winter was bright and crisp and clean.',
+                                                  'Consitution day was a blast!', "We saw grandma's car!", 'Summer!']
+    assert collection[3].period.start == datetime(2018, 7, 1)
+    assert collection[3].written_date == datetime(2018, 6, 17, 10, 0)
@@ -1,6 +1,9 @@
 """Tests for the model compontents of the photo book."""
+import abc
 import re
 
+import pytest
+
 import photobook.model as model
 import photobook.readers as readers
 
@@ -48,6 +51,68 @@ def test_text_stream_backtrack():
     assert stream.get_previous_line() == '¤ this is not'
 
 
+def test_file_reader(tmp_path):
+    path = tmp_path / 'simple.txt'
+    path.write_text(SIMPLE_TEXT + '\n', encoding='utf-8')
+
+    with readers.FileReader(str(path), encoding='utf-8') as reader:
+        stream = readers.TextStream(reader=reader)
+        lines = [stream.get_line() for _ in range(5)]
+    assert reader.stream.closed
+    assert lines == SIMPLE_TEXT.splitlines() + [None]
+
+
+def test_string_reader_end():
+    reader = readers.StringReader(string=SIMPLE_TEXT)
+    assert [reader.read_line() for _ in range(6)] == SIMPLE_TEXT.splitlines() + [None, None]
+
+
+def test_mapped_text_stream(tmp_path):
+    path = tmp_path / 'simple.txt'
+    path.write_bytes(SIMPLE_TEXT.replace('\n', '\r\n').encode('utf-8'))
+
+    with readers.MappedTextStream(str(path), encoding='utf-8') as stream:
+        assert stream.get_line() == 'This is a test.'
+        assert stream.get_line() == '# this is content'
+        assert stream.get_previous_line() == 'This is a test.'
+        assert stream.get_line() == '¤ this is not'
+        assert stream.get_line() == 'fin'
+        assert stream.get_line() is None  # End of file.
+        stream.backtrack_reader_number_of_lines(3)
+        assert stream.get_line() == '¤ this is not'
+        assert stream.line_count == 4
+
+
+def test_mapped_text_stream_unlimited_backtrack(tmp_path):
+    path = tmp_path / 'long.txt'
+    path.write_text('\n'.join(str(i) for i in range(1000)) + '\n', encoding='utf-8')
+
+    with readers.MappedTextStream(str(path)) as stream:
+        for _ in range(1000):
+            stream.get_line()
+        stream.backtrack_reader_number_of_lines(900)
+        assert stream.get_line() == '100'
+        stream.seek(42)
+        assert stream.get_line() == '42'
+        assert stream.tell() == 43
+        stream.seek(1000)
+        assert stream.get_line() is None
+
+
+def test_mapped_text_stream_encodings(tmp_path):
+    path = tmp_path / 'latin.txt'
+    path.write_text('blåbær\nfin\n', encoding='latin-1')
+
+    with readers.MappedTextStream(str(path), encoding='latin-1') as stream:
+        assert stream.get_line() == 'blåbær'
+        assert stream.get_line() == 'fin'
+
+    # Encodings that don't write ASCII as single ASCII bytes, i.e. with wide characters or a byte order mark:
+    for encoding in ['utf-16', 'utf-16-le', 'utf-32', 'utf-8-sig', 'cp037']:
+        with pytest.raises(ValueError):
+            readers.MappedTextStream(str(path), encoding=encoding)
+
+
 def test_content_finder_simple():
     stream = readers.TextStream(reader=readers.StringReader(string=SIMPLE_TEXT))
 
@@ -90,3 +155,113 @@ def test_content_finder_nested():
     # TODO: Figure out why i can't find subtitles.
     assert file.get_contents_by_type(SubTitle)[0].subtitle == 'This is a subtitle.'
     assert file.get_contents_by_type(SubTitle)[0].contents[0].text == 'with subtitle contents.'
+
+
+def test_content_finder_mapped_stream(tmp_path):
+    path = tmp_path / 'simple.txt'
+    path.write_text(SIMPLE_TEXT, encoding='utf-8')
+
+    c = model.ContentFinder(start_pattern=re.compile('^#(?P<stuff>.+)$'),
+                            end_pattern=re.compile('^¤'))
+
+    with readers.MappedTextStream(str(path)) as stream:
+        content = c.search_stream(stream)
+
+    assert content.stuff == ' this is content'
+
+
+def test_start_pattern_dispatch():
+    title = model.ContentFinder(start_pattern=re.compile('^# ?(?P<text>[^#].+)$'))
+    subtitle = model.ContentFinder(start_pattern=re.compile('^## ?(?P<text>.+)$'))
+    shout = model.ContentFinder(start_pattern=re.compile('^HEY (?P<text>.+)$', re.IGNORECASE))
+    text = model.ContentFinder(start_pattern=re.compile('^(?P<text>.+)$'))
+
+    dispatch = model.StartPatternDispatch([title, subtitle, shout, text])
+    assert dispatch.pattern is not None  # Combined into a single pattern, despite the repeated group names.
+    assert dispatch.match('# A title') == (title, {'text': 'A title'})
+    assert dispatch.match('## A subtitle') == (subtitle, {'text': 'A subtitle'})
+    assert dispatch.match('hey you') == (shout, {'text': 'you'})
+    assert dispatch.match('Some text') == (text, {'text': 'Some text'})
+    assert dispatch.match('') is None
+
+    # Numbered backreferences can't be combined, and fall back to sequential matching:
+    repeat = model.ContentFinder(start_pattern=re.compile(r'^(\w+) \1$'))
+    dispatch = model.StartPatternDispatch([repeat, text])
+    assert dispatch.pattern is None
+    assert dispatch.match('again again') == (repeat, {})
+    assert dispatch.match('once') == (text, {'text': 'once'})
+
+    # A finder builds its dispatch once, and again when its sub-finders are replaced:
+    finder = model.ContentFinder(start_pattern=re.compile('^.'), sub_content_finders=[title, text])
+    dispatch = finder.sub_content_dispatch
+    assert finder.sub_content_dispatch is dispatch
+    finder.sub_content_finders = [subtitle, text]
+    assert finder.sub_content_dispatch is not dispatch
+    assert finder.sub_content_dispatch.match('## A subtitle') == (subtitle, {'text': 'A subtitle'})
+
+
+def test_content_finder_iter_contents():
+    class Title(model.Content):
+        pass
+
+    text_finder = model.ContentFinder(start_pattern=re.compile('^(?P<text>[^#].+)$'))
+    title_finder = model.ContentFinder(start_pattern=re.compile('^# ?(?P<title>[^#].+)$'),
+                                       end_pattern=re.compile('^$'),
+                                       content_type=Title,
+                                       sub_content_finders=[text_finder])
+    file_finder = model.FileFinder(sub_content_finders=[title_finder])
+
+    file = file_finder.parse_file(readers.TextStream(reader=readers.StringReader(string=NESTED_TEXT)))
+    titles = list(file_finder.iter_contents(readers.TextStream(reader=readers.StringReader(string=NESTED_TEXT))))
+
+    assert [title.title for title in titles] == [title.title for title in file.contents]
+    assert [[text.text for text in title.contents] for title in titles] == \
+           [[text.text for text in title.contents] for title in file.contents]
+    assert [title.title for title in titles] == ['This is a title.', 'This is another title.']
+
+    # Nothing is found in an empty stream:
+    assert list(file_finder.iter_contents(readers.TextStream(reader=readers.StringReader(string='')))) == []
+
+
+def test_get_contents_by_type_recursive():
+    class Section(model.Content):
+        pass
+
+    class Paragraph(model.Content):
+        pass
+
+    class Quote(Paragraph):
+        pass
+
+    root = model.Content(name='root')
+    first = Section(name='first')
+    nested = Section(name='nested')
+    nested.add_content(Paragraph(name='deep'))
+    nested.add_content(Quote(name='deep quote'))
+    first.add_content(Paragraph(name='intro'))
+    first.add_content(nested)  # A subtree that is already built.
+    root.add_content(first)
+    second = Section(name='second')
+    root.add_content(second)
+    second.add_content(Paragraph(name='late'))  # Added below a content that is already attached.
+    nested.add_content(Paragraph(name='deeper'))  # Added below a content with later siblings in the tree.
+
+    names = lambda contents: [c.name for c in contents]
+    assert names(root.walk()) == ['first', 'intro', 'nested', 'deep', 'deep quote', 'deeper', 'second', 'late']
+    assert names(root.get_contents_by_type(Section)) == ['first', 'nested', 'second']
+    assert names(root.get_contents_by_type(Paragraph)) == ['intro', 'deep', 'deep quote', 'deeper', 'late']
+    assert names(root.get_contents_by_type(Quote)) == ['deep quote']
+    assert names(first.get_contents_by_type(Paragraph)) == ['intro', 'deep', 'deep quote', 'deeper']
+    for t in [model.Content, Section, Paragraph]:  # The index follows the document order of the tree.
+        assert root.get_contents_by_type(t) == [c for c in root.walk() if isinstance(c, t)]
+    assert names(root._get_contents_by_type(Section)) == ['first', 'second']
+    assert second.get_contents_by_type(Quote) == []
+
+    # Types that are not in the index are tested against every content:
+    assert names(root.get_contents_by_type((Quote, Section))) == ['first', 'nested', 'deep quote', 'second']
+    assert names(root.get_contents_by_type(object)) == names(root.walk())
+    class Marked(abc.ABC):
+        pass
+
+    Marked.register(Quote)
+    assert names(root.get_contents_by_type(Marked)) == ['deep quote']
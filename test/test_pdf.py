@@ -0,0 +1,93 @@
+"""Tests for the native PDF backend."""
+import os
+import re
+import glob
+
+from PIL import Image
+
+from photobook import main as photobook, pdf
+from photobook.templates import L3P, Page
+
+BIN = os.path.join(os.path.dirname(__file__), 'bin')
+
+
+def read_objects(filepath):
+    """Return the contents of the file, and check that the cross reference table points at each object."""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    assert data.startswith(b'%PDF-1.4') and data.endswith(b'%%EOF\n')
+    xref = int(re.search(rb'startxref\n(\d+)', data).group(1))
+    entries = re.findall(rb'(\d{10}) 00000 n ', data[xref:])
+    for number, offset in enumerate(entries, start=1):
+        assert data[int(offset):].startswith(f'{number} 0 obj'.encode('ascii'))
+    return data
+
+
+def test_write_book(tmp_path):
+    book = photobook.Photobook(photo_store=os.path.join(BIN, '*.jpg'), text_store=os.path.join(BIN, 'context.md'))
+    filepath = str(tmp_path / 'book.pdf')
+
+    pages = pdf.write_book(book, filepath)
+    data = read_objects(filepath)
+
+    assert pages >= len(book.chapters)
+    assert f'/Count {pages}'.encode('ascii') in data
+    for file in glob.glob(os.path.join(BIN, '*.jpg')):
+        with open(file, 'rb') as f:
+            assert f.read() in data  # Embedded without decoding or encoding.
+    assert data.count(b'/Subtype /Image') == 3
+    assert b'/BaseFont /Helvetica' in data
+
+
+def test_template_page(tmp_path):
+    photos = photobook.PhotoCollection(os.path.join(BIN, '*.jpg'))
+    page = Page(height=12, width=24, unit='cm', margins=0)
+    filepath = str(tmp_path / 'template.pdf')
+
+    with pdf.PdfBook(filepath, page=page) as book:
+        book.add_template(L3P(page=page, photos=[photos[0], photos[1], photos[0]]))
+    data = read_objects(filepath)
+
+    assert data.count(b'/Subtype /Image') == 2  # The repeated photo is only embedded once.
+    assert b'/MediaBox [0 0 680.315 340.157]' in data
+
+
+def test_image_matrices():
+    # The stored top left pixel of a photo must end up where PIL puts it when turning the photo upright:
+    for transpose, matrix in pdf.IMAGE_MATRICES.items():
+        image = Image.new('RGB', (4, 2), 'blue')
+        image.putpixel((0, 0), (255, 0, 0))
+        upright = image if transpose is None else image.transpose(transpose)
+        width, height = upright.size
+        x, y = next((x, y) for x in range(width) for y in range(height) if upright.getpixel((x, y)) == (255, 0, 0))
+
+        a, b, c, d, e, f = matrix(10, 20, 3, 5)
+        u, v = 1 / 8, 3 / 4  # The center of the stored top left pixel, in image space.
+        assert abs((a * u + c * v + e - 10) / 3 - (x + 0.5) / width) < 1e-9
+        assert abs((b * u + d * v + f - 20) / 5 - (1 - (y + 0.5) / height)) < 1e-9
+
+
+def test_cmyk(tmp_path):
+    adobe, plain = str(tmp_path / 'adobe.jpg'), str(tmp_path / 'plain.jpg')
+    Image.new('CMYK', (8, 8)).save(adobe)  # PIL writes an Adobe APP14 segment for CMYK.
+    with open(adobe, 'rb') as f:
+        data = f.read()
+    start = data.index(b'\xff\xee')
+    assert data[start + 4:start + 9] == b'Adobe'
+    with open(plain, 'wb') as f:
+        f.write(data[:start] + data[start + 2 + int.from_bytes(data[start + 2:start + 4], 'big'):])
+
+    # Only the CMYK data of Adobe JPEGs is stored inverted:
+    filepath = str(tmp_path / 'cmyk.pdf')
+    with pdf.PdfWriter(filepath, width=100, height=100) as writer:
+        writer.add_jpeg(adobe)
+        writer.add_jpeg(plain)
+    data = read_objects(filepath)
+    assert data.count(b'/ColorSpace /DeviceCMYK') == 2
+    assert data.count(b'/Decode [1 0 1 0 1 0 1 0]') == 1
+
+
+def test_text():
+    assert pdf.encode_text('(a\\b) æøå') == b'(\\(a\\\\b\\) \xe6\xf8\xe5)'
+    assert pdf.text_width('Ab', 10) == (667 + 556) / 100
+    assert pdf.wrap_text('one two three\r\nfour', pdf.text_width('one two', 10), 10) == ['one two', 'three', 'four']
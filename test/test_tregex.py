@@ -0,0 +1,74 @@
+"""Tests for the regex wrapper."""
+from photobook import tregex
+
+PATTERN = r'(?P<day>\d{2})\.(?P<month>\d{2})'
+STRING = '16.06 and 17.05'
+
+
+def test_process_outputs():
+    assert tregex.name(PATTERN, STRING) == [{'day': '16', 'month': '06'}, {'day': '17', 'month': '05'}]
+    assert tregex.match(PATTERN, STRING) == ['16.06', '17.05']
+    assert tregex.group(PATTERN, STRING) == [('16', '06'), ('17', '05')]
+    assert tregex.smart(PATTERN, STRING) == tregex.name(PATTERN, STRING)
+    assert tregex.name(PATTERN, 'no dates') == []
+
+
+def test_iterators():
+    assert list(tregex.iter_name(PATTERN, STRING)) == tregex.name(PATTERN, STRING)
+    assert list(tregex.iter_match(PATTERN, STRING)) == tregex.match(PATTERN, STRING)
+    assert list(tregex.iter_group(PATTERN, STRING)) == tregex.group(PATTERN, STRING)
+
+    assert tregex.first_name(PATTERN, STRING) == {'day': '16', 'month': '06'}
+    assert tregex.first_match(PATTERN, STRING) == '16.06'
+    assert tregex.first_group(PATTERN, STRING) == ('16', '06')
+    assert tregex.first_name(PATTERN, 'no dates') is None
+
+
+def test_pattern_cache():
+    tregex.cache_clear()
+    tregex.name(PATTERN, STRING)
+    tregex.name(PATTERN, STRING)
+    tregex.match(PATTERN, STRING)  # The rewritten pattern is cached separately.
+    tregex.match(PATTERN, STRING)
+
+    assert tregex.cache_info() == tregex.CacheInfo(hits=2, misses=2, maxsize=tregex.PATTERN_CACHE_SIZE, currsize=2)
+    tregex.cache_clear()
+    assert tregex.cache_info().currsize == 0
+
+
+def reference_find(search_string, search_list, score_cutoff=tregex.DEFAULT_SEARCH_SCORE_CUTOFF, scores=False):
+    # The original, unindexed implementation of tregex.find.
+    search_string_p = search_string.lower()
+    search_list_p = [s.lower() for s in search_list]
+    similarity_scores = [tregex.similarity(search_string_p, item) for item in search_list_p]
+    scores_cutoff = [(score, item) for score, item in zip(similarity_scores, search_list) if score >= score_cutoff]
+    scores_sorted = sorted(scores_cutoff, key=lambda x: x[0], reverse=True)
+    contains_match = [orig for orig, case in zip(search_list, search_list_p)
+                      if search_string_p in case
+                      and orig not in [item[1] for item in scores_sorted]]
+    contains_sorted = sorted(contains_match, key=lambda x: len(x), reverse=False)
+    result = scores_sorted + [(tregex.CONTENT_MATCH_DEFAULT_SCORE, item) for item in contains_sorted]
+    return result if scores else [item[1] for item in result]
+
+
+NAMES = ['Tobias', 'Tobias Litherland', 'tobias', 'Toby', 'Bias', 'Mathias', 'Tom', 'Tobiassen', 'Anne Tobiassen',
+         'Kari', 'Kari Nordmann', 'Ola Nordmann', 'Nordmann', 'T', '', 'Ola', 'Tobias Litherland jr.']
+
+
+def test_find_matches_reference():
+    for search in ['Tobias', 'tob', 'Nordmann', 'ola', 'x', 'Kari Nordman', 'Tobias Litherland']:
+        for cutoff in [0, 0.3, tregex.DEFAULT_SEARCH_SCORE_CUTOFF, 0.9]:
+            assert tregex.find(search, NAMES, score_cutoff=cutoff, scores=True) == \
+                reference_find(search, NAMES, score_cutoff=cutoff, scores=True)
+        assert tregex.find_best(search, NAMES) == reference_find(search, NAMES, score_cutoff=0)[0]
+
+
+def test_search_index_top_k(monkeypatch):
+    index = tregex.SearchIndex(NAMES)
+    cases = [(search, k, cutoff) for search in ['Tobias', 'tob', 'Nordmann', 'x', 'a'] for k in [1, 2, 5, 20]
+             for cutoff in [0.3, tregex.DEFAULT_SEARCH_SCORE_CUTOFF, 0.9]]
+    expected = [reference_find(search, NAMES, score_cutoff=cutoff, scores=True)[:k] for search, k, cutoff in cases]
+
+    # The content matches reuse the scores of the ranked search, instead of scoring the items again:
+    monkeypatch.setattr(tregex, 'similarity', None)
+    assert [index.find(search, score_cutoff=cutoff, scores=True, k=k) for search, k, cutoff in cases] == expected